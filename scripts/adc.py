@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+
+def scale_codes(codes, scale, offset):
+    # Raw ADC codes -> physical values (codes * scale + offset)
+    # float32 holds 16 bit codes exactly
+    values = np.empty(codes.shape[0], dtype=np.float32
+                      if codes.dtype.itemsize <= 2 else np.float64)
+    np.multiply(codes, scale, out=values)
+    values += offset
+    return values
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import mmap
+import struct
+from collections import OrderedDict
+
+import numpy as np
+
+from common import RecordBatch, json_default
+
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+OUTPUT_FORMATS = ('csv', 'archive')
+ARCHIVE_MAGIC = b'WFA1'
+# Record layout:
+#   magic (4 bytes) | header size (uint32) | JSON header | column data
+# Header and every column are padded to 8 bytes so that the arrays can be
+# mapped without copying.
+_RECORD_PREFIX = struct.Struct('<4sI')
+_ALIGNMENT = 8
+
+
+def check_output_format(output_format):
+    if output_format not in OUTPUT_FORMATS:
+        logger.error('Unknown output format: %s (expected one of %s)',
+                     output_format, ', '.join(OUTPUT_FORMATS))
+        raise ValueError('Unknown output format: %s' % output_format)
+
+
+def _padding(size):
+    return -size % _ALIGNMENT
+
+
+class WaveformArchive():
+    def __init__(self, filename, mode='a'):
+        self.filename = filename
+        self._file = None
+        if mode not in ('a', 'w'):
+            logger.error('Invalid archive mode: %s', mode)
+            raise ValueError('Invalid archive mode: %s' % mode)
+        self._file = open(filename, mode + 'b')
+
+    def append(self, batch, meta=None):
+        if self._file is None:
+            raise ValueError('WaveformArchive is already closed: %s'
+                             % self.filename)
+
+        record_meta = dict(batch.meta)
+        if meta is not None:
+            record_meta.update(meta)
+
+        arrays = list()
+        columns = list()
+        offset = 0
+        for label, column in batch.items():
+            column = np.ascontiguousarray(column)
+            if column.dtype.hasobject:
+                logger.error('Object column cannot be archived: %s', label)
+                raise ValueError('Object column cannot be archived: %s'
+                                 % label)
+            columns.append(dict(label=label, dtype=column.dtype.str,
+                                offset=offset,
+                                unit=batch.units.get(label, '')))
+            arrays.append(column)
+            offset += column.nbytes + _padding(column.nbytes)
+
+        header = json.dumps(dict(length=len(batch), size=offset,
+                                 columns=columns, meta=record_meta),
+                            default=json_default).encode('utf-8')
+        header += b' ' * _padding(_RECORD_PREFIX.size + len(header))
+
+        self._file.write(_RECORD_PREFIX.pack(ARCHIVE_MAGIC, len(header)))
+        self._file.write(header)
+        for column in arrays:
+            self._file.write(column.data)
+            self._file.write(b'\0' * _padding(column.nbytes))
+        self._file.flush()
+
+    def __call__(self, batch, meta=None):
+        self.append(batch, meta)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
+def parse_header(buf, pos):
+    # Returns (header, position of the column data)
+    magic, header_size = _RECORD_PREFIX.unpack_from(buf, pos)
+    if magic != ARCHIVE_MAGIC:
+        logger.error('Invalid archive record at %d', pos)
+        raise ValueError('Invalid archive record at %d' % pos)
+
+    pos += _RECORD_PREFIX.size
+    if pos + header_size > len(buf):
+        raise EOFError('Truncated archive header at %d' % pos)
+    header = json.loads(bytes(buf[pos:pos + header_size]).decode('utf-8'))
+    pos += header_size
+    if pos + header['size'] > len(buf):
+        raise EOFError('Truncated archive record at %d' % pos)
+    return header, pos
+
+
+def parse_record(buf, pos):
+    # Returns (RecordBatch, position of the next record)
+    header, pos = parse_header(buf, pos)
+    columns = OrderedDict()
+    units = dict()
+    for column in header['columns']:
+        columns[column['label']] = np.frombuffer(
+            buf, dtype=column['dtype'], count=header['length'],
+            offset=pos + column['offset'])
+        units[column['label']] = column['unit']
+
+    return RecordBatch(columns, units, header['meta']), pos + header['size']
+
+
+def iter_archive(filename):
+    with open(filename, 'rb') as f:
+        buf = f.read()
+
+    pos = 0
+    while pos + _RECORD_PREFIX.size <= len(buf):
+        try:
+            batch, pos = parse_record(buf, pos)
+        except EOFError as e:
+            # The last record was not completely written
+            logger.warning('%s: %s', filename, e)
+            return
+        yield batch
+
+
+def load_archive(filename):
+    return list(iter_archive(filename))
+
+
+class ArchiveReader():
+    # Random access to the records of an archive through a memory map.
+    # Only the headers are parsed on open and columns are returned as views.
+    def __init__(self, filename):
+        self.filename = filename
+        self._mmap = None
+        with open(filename, 'rb') as f:
+            if os.fstat(f.fileno()).st_size > 0:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._headers = list()
+        self._positions = list()
+        try:
+            self._scan()
+        except Exception:
+            # No reader is returned to close the map
+            self.close()
+            raise
+
+        # Index
+        metas = [header['meta'] for header in self._headers]
+        self.acquisitions = np.asarray([meta.get('acquisition', i)
+                                        for i, meta in enumerate(metas)],
+                                       dtype=np.int64)
+        self.times = np.asarray([meta.get('time', np.nan) for meta in metas],
+                                dtype=np.float64)
+        self.setpoints = np.asarray([meta.get('setpoint', np.nan)
+                                     for meta in metas], dtype=np.float64)
+        self._acquisition_order = np.argsort(self.acquisitions, kind='stable')
+        self._time_order = np.argsort(self.times, kind='stable')
+
+    def _scan(self):
+        pos = 0
+        size = 0 if self._mmap is None else len(self._mmap)
+        while pos + _RECORD_PREFIX.size <= size:
+            try:
+                header, data_pos = parse_header(self._mmap, pos)
+            except EOFError as e:
+                # The last record was not completely written
+                logger.warning('%s: %s', self.filename, e)
+                break
+            self._headers.append(header)
+            self._positions.append(data_pos)
+            pos = data_pos + header['size']
+
+    def __len__(self):
+        return len(self._headers)
+
+    def meta(self, i):
+        return self._headers[i]['meta']
+
+    def column(self, i, label):
+        header = self._headers[i]
+        for column in header['columns']:
+            if column['label'] == label:
+                return np.frombuffer(
+                    self._mmap, dtype=column['dtype'], count=header['length'],
+                    offset=self._positions[i] + column['offset'])
+        logger.error('No column "%s" in record %d', label, i)
+        raise KeyError(label)
+
+    def __getitem__(self, i):
+        header = self._headers[i]
+        columns = OrderedDict([(column['label'],
+                                self.column(i, column['label']))
+                               for column in header['columns']])
+        units = {column['label']: column['unit']
+                 for column in header['columns']}
+        return RecordBatch(columns, units, header['meta'])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def channel(self, label, records=None):
+        # Views of one channel across records
+        if records is None:
+            records = range(len(self))
+        return [self.column(i, label) for i in records]
+
+    def find_acquisition(self, acquisition):
+        sorted_acquisitions = self.acquisitions[self._acquisition_order]
+        j = np.searchsorted(sorted_acquisitions, acquisition)
+        if j == len(self) or sorted_acquisitions[j] != acquisition:
+            logger.error('No acquisition %d in %s', acquisition, self.filename)
+            raise KeyError(acquisition)
+        return int(self._acquisition_order[j])
+
+    def find_time(self, t):
+        # The last record at or before t
+        j = np.searchsorted(self.times[self._time_order], t, side='right') - 1
+        if j < 0:
+            logger.error('No record before %f in %s', t, self.filename)
+            raise KeyError(t)
+        return int(self._time_order[j])
+
+    def select_time(self, start, end):
+        sorted_times = self.times[self._time_order]
+        i, j = np.searchsorted(sorted_times, (start, end), side='left')
+        return np.sort(self._time_order[i:j])
+
+    def select_setpoint(self, setpoint, tolerance=1.0e-6):
+        return np.nonzero(np.abs(self.setpoints - setpoint) <= tolerance)[0]
+
+    def close(self):
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Views are still referenced; the map is released with them
+                pass
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
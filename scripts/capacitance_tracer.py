@@ -3,8 +3,10 @@
 import os
 import time
 
+from catalog import Catalog, DEFAULT_CATALOG_PATH, run_parameters
+from common import CSVWriter
 from device import LCRMeter
-from gui import GPIBArgumentParser, MeasureMonitor, DialogMode
+from gui import GPIBArgumentParser, MonitorProcess, DialogMode
 
 from logging import getLogger, INFO, StreamHandler, NullHandler
 root_logger = getLogger()
@@ -21,6 +23,9 @@ def parse_arguments():
                         help='Path to output file.')
     parser.add_argument('interval', 1.0, type=float,
                         help='Measurement interval')
+    parser.add_argument('catalog', os.path.abspath(DEFAULT_CATALOG_PATH),
+                        browse_mode=DialogMode.WRITE,
+                        help='SQLite catalog of the measurements.')
     parser.add_device('LCR meter', LCRMeter)
 
     args = parser.parse_args()
@@ -32,27 +37,34 @@ def main():
 
     outfile = args['output file']
     os.makedirs(os.path.dirname(outfile), exist_ok=True)
-    with open(outfile, 'w') as f:
-        f.write('# Time / s, capacitance / pF')
+    writer = CSVWriter(outfile, [
+        CSVWriter.OutputParameter('Time', fmt='%.1f', unit='s'),
+        CSVWriter.OutputParameter('capacitance', fmt='%.8e', unit='pF'),
+    ])
+    with Catalog(args['catalog']) as catalog:
+        catalog.start_run('capacitance_tracer', run_parameters(args))
+        catalog.register(outfile, kind='trace',
+                         channels=[p.label for p in writer.params])
 
     lcr = args['device']['LCR meter']
+    lcr.enable_settings_cache()
     lcr.set_mode(lcr.Mode.CAPACITANCE, is_big_value=False)
 
-    view = MeasureMonitor('Time / s', 'Capacitance / pF')
+    view = MonitorProcess.MonitorParameter('Time / s', 'Capacitance / pF')
     view.add_plot(value_fmt='%.5e')
-    monitor = MeasureMonitor(view)
+    monitor = MonitorProcess(view)
 
     t0 = time.time()
     c_mul = 1.0e12
-    while True:
-        time.sleep(args['interval'])
-        t = time.time() - t0
-        c = lcr.get() * c_mul
+    with writer:
+        while True:
+            time.sleep(args['interval'])
+            t = time.time() - t0
+            c = lcr.get() * c_mul
 
-        with open(outfile, 'a') as f:
-            f.write('%.1f, %.8e\n' % (t, c))
+            writer({'Time': t, 'capacitance': c})
 
-        monitor.update((t, c))
+            monitor.update((t, c))
 
 
 if __name__ == '__main__':
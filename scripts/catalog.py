@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import sqlite3
+import threading
+
+import numpy as np
+
+from common import json_default
+
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+# Next to the default output paths of the scripts, which show the resolved
+# path as their "catalog" argument
+DEFAULT_CATALOG_PATH = os.path.join('.', 'data', 'catalog.sqlite')
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    script TEXT,
+    started REAL,
+    parameters TEXT
+);
+CREATE TABLE IF NOT EXISTS acquisitions (
+    id INTEGER PRIMARY KEY,
+    run INTEGER REFERENCES runs(id),
+    kind TEXT,
+    path TEXT,
+    record INTEGER,
+    timestamp REAL,
+    setpoint REAL,
+    temperature REAL,
+    frequency REAL,
+    channels TEXT,
+    meta TEXT
+);
+CREATE INDEX IF NOT EXISTS acquisitions_run ON acquisitions(run);
+CREATE INDEX IF NOT EXISTS acquisitions_timestamp ON acquisitions(timestamp);
+CREATE INDEX IF NOT EXISTS acquisitions_setpoint ON acquisitions(setpoint);
+CREATE INDEX IF NOT EXISTS acquisitions_temperature
+    ON acquisitions(temperature);
+CREATE INDEX IF NOT EXISTS acquisitions_frequency ON acquisitions(frequency);
+'''
+
+# Query keyword -> column
+_QUERY_COLUMNS = ('run', 'kind', 'path', 'timestamp', 'setpoint',
+                  'temperature', 'frequency')
+
+
+def _to_real(value):
+    if value is None:
+        return None
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def run_parameters(args):
+    # Parsed arguments with devices replaced by their addresses
+    params = dict(args)
+    if 'device' in params:
+        params['device'] = {label: getattr(dev, 'address', None)
+                            for label, dev in params['device'].items()}
+    return params
+
+
+class Catalog():
+    def __init__(self, path=DEFAULT_CATALOG_PATH):
+        self.path = path
+        self.run = None
+        dirname = os.path.dirname(path)
+        if len(dirname) > 0:
+            os.makedirs(dirname, exist_ok=True)
+
+        # Writers register acquisitions from their own threads
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def start_run(self, script, parameters=None):
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                'INSERT INTO runs (script, started, parameters) '
+                'VALUES (?, ?, ?)',
+                (script, time.time(),
+                 json.dumps(parameters, default=json_default)))
+        self.run = cur.lastrowid
+        logger.info('Catalog run %d: %s', self.run, script)
+        return self.run
+
+    def register(self, path, kind=None, record=None, timestamp=None,
+                 setpoint=None, temperature=None, frequency=None,
+                 channels=None, meta=None):
+        if timestamp is None:
+            timestamp = time.time()
+        channels = None if channels is None else ','.join(channels)
+
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                'INSERT INTO acquisitions (run, kind, path, record, '
+                'timestamp, setpoint, temperature, frequency, channels, meta) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (self.run, kind, os.path.abspath(path), record,
+                 _to_real(timestamp), _to_real(setpoint),
+                 _to_real(temperature), _to_real(frequency), channels,
+                 json.dumps(meta, default=json_default)))
+        return cur.lastrowid
+
+    def query(self, **conditions):
+        # Each condition is a value or a (min, max) range (None: unbounded)
+        clauses = list()
+        values = list()
+        for key, cond in conditions.items():
+            if key not in _QUERY_COLUMNS:
+                logger.error('Invalid query key: %s', key)
+                raise ValueError('Invalid query key: %s' % key)
+            if isinstance(cond, (tuple, list)):
+                low, high = cond
+                if low is not None:
+                    clauses.append('%s >= ?' % key)
+                    values.append(low)
+                if high is not None:
+                    clauses.append('%s <= ?' % key)
+                    values.append(high)
+            else:
+                clauses.append('%s = ?' % key)
+                values.append(cond)
+
+        sql = 'SELECT * FROM acquisitions'
+        if len(clauses) > 0:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY timestamp'
+
+        with self._lock:
+            rows = self._conn.execute(sql, values).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def near(self, key, value, tolerance, **conditions):
+        conditions[key] = (value - tolerance, value + tolerance)
+        return self.query(**conditions)
+
+    def runs(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM runs ORDER BY id')
+            rows = rows.fetchall()
+        return [dict(row, parameters=json.loads(row['parameters']))
+                for row in rows]
+
+    @staticmethod
+    def _to_dict(row):
+        row = dict(row)
+        row['channels'] = list() if row['channels'] is None \
+            else row['channels'].split(',')
+        row['meta'] = json.loads(row['meta'])
+        return row
+
+    def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -1,28 +1,218 @@
 # -*- coding: utf-8 -*-
+import os
+import atexit
 import math
+import time
+import queue
+import itertools
+import threading
+from collections import OrderedDict
+
 import numpy as np
 import matplotlib.pyplot as plt
 
+from adc import scale_codes
+
 from logging import getLogger, NullHandler
 logger = getLogger(__name__)
 logger.addHandler(NullHandler())
 
+# The number of rows formatted and written at once
+CSV_CHUNK_ROWS = 65536
+
+
+class RecordBatch():
+    def __init__(self, columns, units=None, meta=None):
+        self._columns = OrderedDict([(label, np.asarray(column))
+                                     for label, column in columns.items()])
+        lengths = set([column.shape[0] for column in self._columns.values()])
+        if len(lengths) > 1:
+            raise ValueError('All columns should have the same length')
+        self._length = lengths.pop() if len(lengths) > 0 else 0
+
+        self.units = dict() if units is None else dict(units)
+        self.meta = dict() if meta is None else dict(meta)
+
+    @classmethod
+    def from_rows(cls, rows, labels=None, units=None, meta=None):
+        rows = list(rows)
+        if labels is None:
+            labels = list(rows[0].keys()) if len(rows) > 0 else list()
+
+        columns = OrderedDict([(label, np.asarray([row[label] for row in rows]))
+                               for label in labels])
+        return cls(columns, units, meta)
+
+    @classmethod
+    def concatenate(cls, batches):
+        batches = list(batches)
+        if len(batches) == 0:
+            return cls(OrderedDict())
+
+        labels = batches[0].labels
+        columns = OrderedDict([(label, np.concatenate([b[label]
+                                                       for b in batches]))
+                               for label in labels])
+        return cls(columns, batches[0].units, batches[0].meta)
+
+    @property
+    def labels(self):
+        return list(self._columns.keys())
+
+    @property
+    def columns(self):
+        return list(self._columns.values())
+
+    def __len__(self):
+        return self._length
+
+    def __contains__(self, label):
+        return label in self._columns
+
+    def __getitem__(self, label):
+        return self._columns[label]
+
+    def items(self):
+        return self._columns.items()
+
+    def rows(self):
+        for i in range(self._length):
+            yield {label: column[i] for label, column in self._columns.items()}
+
+    def time(self, label=None):
+        # Uniformly sampled time axis is generated when it is read
+        if 'time' in self._columns:
+            return self._columns['time']
+        dts = self.meta.get('dt', dict())
+        if len(dts) == 0:
+            logger.error('No time base in the batch')
+            raise ValueError('No time base in the batch')
+        if label is None:
+            label = next(iter(dts))
+        return self.meta['t0'][label] + np.arange(self._length) * dts[label]
+
+    def is_raw(self, label):
+        return label in self.meta.get('scale', dict())
+
+    def physical(self, label):
+        # Raw ADC codes are converted when they are read
+        column = self._columns[label]
+        if not self.is_raw(label):
+            return column
+        return scale_codes(column, self.meta['scale'][label],
+                           self.meta['offset'][label])
+
+    def physical_unit(self, label):
+        # Unit of physical() (raw columns are in "code")
+        if self.is_raw(label):
+            return self.meta.get('unit', dict()).get(label, '')
+        return self.units.get(label, '')
+
+    def to_physical(self):
+        # Batch whose raw code columns are converted
+        columns = OrderedDict([(label, self.physical(label))
+                               for label in self.labels])
+        units = {label: self.physical_unit(label) for label in self.labels}
+        meta = {key: value for key, value in self.meta.items()
+                if key not in ('scale', 'offset', 'unit')}
+        return RecordBatch(columns, units, meta)
+
+
+def json_default(value):
+    # json.dumps(default=...) for metadata of the archive and the catalog:
+    # NumPy values are converted to Python ones, and the others (e.g.
+    # paths or enums) are stored as their string representation
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def waveform_batch(data, meta=None):
+    # Oscilloscope data {channel: (time, voltage) or Waveform} -> RecordBatch
+    columns = OrderedDict()
+    units = dict()
+    meta = dict() if meta is None else dict(meta)
+    for label, wf in data.items():
+        if hasattr(wf, 'dt'):
+            if len(wf) == 0:
+                continue
+            # Time base is stored instead of the time column
+            meta.setdefault('t0', dict())[label] = wf.t0
+            meta.setdefault('dt', dict())[label] = wf.dt
+            if wf.raw:
+                # Store raw codes with their scale and offset
+                meta.setdefault('scale', dict())[label] = wf.scale
+                meta.setdefault('offset', dict())[label] = wf.offset
+                meta.setdefault('unit', dict())[label] = 'V'
+            columns[label] = wf.values
+            units[label] = 'code' if wf.raw else 'V'
+        else:
+            ts, vs = wf
+            if ts.shape[0] == 0:
+                continue
+            if 'time' not in columns:
+                columns['time'] = ts
+                units['time'] = 's'
+            columns[label] = vs
+            units[label] = 'V'
+
+    return RecordBatch(columns, units, meta)
+
+
+def waveform_comments(meta):
+    # Time base and scale of each channel
+    comments = list()
+    for label, dt in meta.get('dt', dict()).items():
+        comments.append('%s: t0 %.8e s, dt %.8e s'
+                        % (label, meta['t0'][label], dt))
+    for label, scale in meta.get('scale', dict()).items():
+        comments.append('%s: scale %.8e, offset %.8e'
+                        % (label, scale, meta['offset'][label]))
+    return comments
+
+
+def column_format(batch, label, fmt='%.5e'):
+    # Raw codes are written as integers
+    if batch.is_raw(label):
+        return '%d'
+    return fmt
+
 
 def write_csv(filename, columns, labels=None, comments=None):
-    csv_text = ''
-    if comments is not None:
-        for line in comments:
-            csv_text += '# %s\n' % line
-    if labels is not None:
-        csv_text += '# %s\n' % '.'.join(labels)
+    comments = list() if comments is None else list(comments)
+    fmts = None
+    if isinstance(columns, RecordBatch):
+        if labels is None:
+            labels = columns.labels
+        comments.extend(waveform_comments(columns.meta))
+        fmts = [column_format(columns, label) for label in columns.labels]
+        columns = columns.columns
+    if fmts is None:
+        fmts = ['%.5e'] * len(columns)
 
-    for i in range(len(columns[0])):
-        for column in columns:
-            csv_text += '%.5e, ' % column[i]
-        csv_text += '\n'
+    header = ''
+    for line in comments:
+        header += '# %s\n' % line
+    if labels is not None:
+        header += '# %s\n' % '.'.join(labels)
 
+    row_fmt = ''.join(['%s, ' % fmt for fmt in fmts]) + '\n'
     with open(filename, 'wt') as f:
-        f.write(csv_text)
+        f.write(header)
+        for text in format_rows(row_fmt, columns):
+            f.write(text)
+
+
+def format_rows(row_fmt, columns, chunk_rows=CSV_CHUNK_ROWS):
+    # Format each chunk of rows by one string operation
+    n_rows = len(columns[0]) if len(columns) > 0 else 0
+    for i in range(0, n_rows, chunk_rows):
+        chunk = [np.asarray(column[i:i + chunk_rows]).tolist()
+                 for column in columns]
+        values = tuple(itertools.chain.from_iterable(zip(*chunk)))
+        yield (row_fmt * len(chunk[0])) % values
 
 
 class CSVWriter():
@@ -50,9 +240,27 @@ class CSVWriter():
             else:
                 return self._fmt % self._fn(value)
 
+        @property
+        def fmt(self):
+            return self._fmt
+
+        def convert(self, values):
+            if self._fn is None:
+                return values
+            return [self._fn(value) for value in values]
 
-    def __init__(self, filename, params):
+
+    def __init__(self, filename, params, flush_rows=None, flush_interval=1.0,
+                 fsync_interval=None, comments=None, delimiter=', '):
         self.filename = filename
+        self._file = None
+        # Separator of the values in a row
+        self.delimiter = delimiter
+        # Flush when either of the row count or the time (s) is reached
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        # Force data onto the disk periodically (s)
+        self.fsync_interval = fsync_interval
 
         # Type check
         if isinstance(params, self.OutputParameter):
@@ -66,18 +274,165 @@ class CSVWriter():
 
         # Generate header
         self.params = params
-        with open(filename, 'w') as f:
-            f.write('# %s\n' % ', '.join([p.header for p in params]))
-
+        self._file = open(filename, 'w')
+        if comments is not None:
+            for line in comments:
+                self._file.write('# %s\n' % line)
+        self._file.write('# %s\n' % ', '.join([p.header for p in params]))
+        self._n_pending = 0
+        self._last_flush = self._last_fsync = time.time()
+        self.flush()
 
     def __call__(self, kwargs):
-        if isinstance(kwargs, dict):
-            kwargs = [kwargs]
+        if self._file is None:
+            raise ValueError('CSVWriter is already closed: %s' % self.filename)
 
-        with open(self.filename, 'a') as f:
+        if isinstance(kwargs, RecordBatch):
+            self._write_batch(kwargs)
+        else:
+            if isinstance(kwargs, dict):
+                kwargs = [kwargs]
             for row in kwargs:
-                f.write('%s\n' %
-                        ', '.join([p(row[p.label]) for p in self.params]))
+                self._file.write('%s\n' % self.delimiter.join(
+                    [p(row[p.label]) for p in self.params]))
+                self._n_pending += 1
+
+        self._apply_flush_policy()
+
+    def _write_batch(self, batch):
+        row_fmt = self.delimiter.join([p.fmt for p in self.params]) + '\n'
+        columns = [p.convert(batch[p.label]) for p in self.params]
+        for text in format_rows(row_fmt, columns):
+            self._file.write(text)
+        self._n_pending += len(batch)
+
+    def _apply_flush_policy(self):
+        now = time.time()
+        if self.fsync_interval is not None and \
+           now - self._last_fsync >= self.fsync_interval:
+            self.fsync()
+        elif self.flush_rows is not None and \
+             self._n_pending >= self.flush_rows:
+            self.flush()
+        elif self.flush_interval is not None and \
+             now - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+            self._n_pending = 0
+            self._last_flush = time.time()
+
+    def fsync(self):
+        if self._file is not None:
+            self.flush()
+            os.fsync(self._file.fileno())
+            self._last_fsync = self._last_flush
+
+    def close(self):
+        if self._file is not None:
+            if self.fsync_interval is not None:
+                self.fsync()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
+class AsyncWriter():
+    def __init__(self, writer, maxsize=64):
+        self._writer = writer
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.n_written = 0
+        self.max_depth = 0
+        self.latency = float('nan')
+        self.max_latency = 0.0
+        self._total_latency = 0.0
+
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        # Queued data is written even when the script exits by an error
+        atexit.register(self.close)
+
+    @property
+    def depth(self):
+        return self._queue.qsize()
+
+    @property
+    def mean_latency(self):
+        with self._lock:
+            if self.n_written == 0:
+                return float('nan')
+            return self._total_latency / self.n_written
+
+    def _loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                args, kwargs = item
+                t = time.time()
+                try:
+                    self._writer(*args, **kwargs)
+                except Exception:
+                    logger.exception('Failed to write data')
+                t = time.time() - t
+
+                with self._lock:
+                    self.n_written += 1
+                    self.latency = t
+                    self.max_latency = max(self.max_latency, t)
+                    self._total_latency += t
+            finally:
+                self._queue.task_done()
+
+    def __call__(self, *args, **kwargs):
+        if self._thread is None:
+            logger.error('AsyncWriter is already closed')
+            raise ValueError('AsyncWriter is already closed')
+
+        # Block the caller only when the queue is full
+        self._queue.put((args, kwargs))
+        with self._lock:
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    def drain(self):
+        self._queue.join()
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        atexit.unregister(self.close)
+
+        if hasattr(self._writer, 'close'):
+            self._writer.close()
+        logger.debug('%d writes (max depth: %d, mean latency: %.3e s, '
+                     'max latency: %.3e s)', self.n_written, self.max_depth,
+                     self.mean_latency, self.max_latency)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __del__(self):
+        self.close()
 
 
 class MeasureMonitor(object):
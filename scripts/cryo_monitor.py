@@ -4,9 +4,11 @@ import os
 import time
 import math
 
+from catalog import Catalog, DEFAULT_CATALOG_PATH, run_parameters
+from common import CSVWriter
 from device import LockinAmplifier, FrequencyCounter,\
                    Multimeter, TempratureController
-from gui import GPIBArgumentParser, MeasureMonitor, DialogMode
+from gui import GPIBArgumentParser, MonitorProcess, DialogMode
 
 from logging import getLogger, INFO, StreamHandler, NullHandler
 root_logger = getLogger()
@@ -28,6 +30,9 @@ def parse_arguments():
                         help='Path to output file.')
     parser.add_argument('measurement interval', 5.0, type=float,
                         help='Measurement interval time')
+    parser.add_argument('catalog', os.path.abspath(DEFAULT_CATALOG_PATH),
+                        browse_mode=DialogMode.WRITE,
+                        help='SQLite catalog of the measurements.')
     parser.add_device('Lock-in amplifier', LockinAmplifier)
     parser.add_device('Frequency counter', FrequencyCounter)
     parser.add_device('DC-Vol', Multimeter)
@@ -38,26 +43,30 @@ def parse_arguments():
 
 
 def setup_monitor():
-    ghs_view = MeasureMonitor.MonitorParameter('Time / s', 'Pressure / atm')
+    ghs_view = MonitorProcess.MonitorParameter('Time / s', 'Pressure / atm')
     ghs_view.add_plot(key='P', value_fmt='%.5f atm')
-    freq_view = MeasureMonitor.MonitorParameter('Time / s', 'Frequency / Hz')
+    freq_view = MonitorProcess.MonitorParameter('Time / s', 'Frequency / Hz')
     freq_view.add_plot(key='f', value_fmt='%.6f Hz')
-    temp_view = MeasureMonitor.MonitorParameter('Time / s', 'Temperature / K')
+    temp_view = MonitorProcess.MonitorParameter('Time / s', 'Temperature / K')
     temp_view.add_plot(key='T', value_fmt='%.4f K')
-    phase_view = MeasureMonitor.MonitorParameter('Time / s', 'Phase / deg')
+    phase_view = MonitorProcess.MonitorParameter('Time / s', 'Phase / deg')
     phase_view.add_plot(key='theta', value_fmt='%.1f')
-    amp_view = MeasureMonitor.MonitorParameter('Time / s', 'Amplitude / mV',
+    amp_view = MonitorProcess.MonitorParameter('Time / s', 'Amplitude / mV',
                                                ymul=1.0e3)
     amp_view.add_plot(key='R', value_fmt='%.3e mV')
-    return MeasureMonitor(ghs_view, temp_view, freq_view, phase_view, amp_view)
+    return MonitorProcess(ghs_view, temp_view, freq_view, phase_view, amp_view)
 
 
 def main():
     args = parse_arguments()
 
     outfile = args['output file']
-    with open(outfile, 'w') as f:
-        f.write('# %s\n' % ', '.join(DATA_LABELS))
+    writer = CSVWriter(outfile, [CSVWriter.OutputParameter(lbl, fmt='%s')
+                                 for lbl in DATA_LABELS], delimiter=',')
+    with Catalog(args['catalog']) as catalog:
+        catalog.start_run('cryo_monitor', run_parameters(args))
+        catalog.register(outfile, kind='trace',
+                         channels=[p.label for p in writer.params])
 
     wait_time = args.get('measurement interval')
 
@@ -73,23 +82,21 @@ def main():
     P_mul = 1.0e6 / 101325 # MPa -> atm
 
     t0 = time.time()
-    while True:
-        f = counter.get()
-        r, theta = lockin.get_amplitude()
-        x = math.cos(math.radians(theta)) * r
-        y = math.sin(math.radians(theta)) * r
-        t = time.time() - t0
-        P = dcvol.get_voltage() * P_mul
-        T = temp.get_temprature()[0]
-
-        with open(outfile, 'a') as fout:
-            fout.write('%s\n' % ','.join([str(v) for v in (
-                t, T, P, f, x, y, r, theta
-            )]))
-
-        monitor.update((t, P), (t, T), (t, f), (t, theta), (t, r))
-
-        time.sleep(wait_time)
+    with writer:
+        while True:
+            f = counter.get()
+            r, theta = lockin.get_amplitude()
+            x = math.cos(math.radians(theta)) * r
+            y = math.sin(math.radians(theta)) * r
+            t = time.time() - t0
+            P = dcvol.get_voltage() * P_mul
+            T = temp.get_temprature()[0]
+
+            writer(dict(zip(DATA_LABELS, (t, T, P, f, x, y, r, theta))))
+
+            monitor.update((t, P), (t, T), (t, f), (t, theta), (t, r))
+
+            time.sleep(wait_time)
 
 
 if __name__ == '__main__':
@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pyvisa as visa
 
 from .provider import DeviceProvider
+from .registry import DriverRegistry, register_driver
+from .cache import IdentificationCache, DEFAULT_CACHE_PATH
 from .interface import DeviceHandler
 from .lockin_amplifier import LockinAmplifier
 from .signal_generator import SignalGenerator
@@ -11,10 +15,50 @@ from .lcr_meter import LCRMeter
 from .frequency_counter import FrequencyCounter
 from .temprature_controller import TempratureController
 
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
 
-def get_devices():
-    rm = visa.ResourceManager()
-    provider = DeviceProvider(rm)
+# Timeout (ms) for each "*IDN?" probe
+PROBE_TIMEOUT = 2000
+
+
+def iter_devices(address=None, timeout=PROBE_TIMEOUT, resource_manager=None,
+                 cache=None):
+    rm = resource_manager
+    if not isinstance(rm, visa.ResourceManager):
+        rm = visa.ResourceManager()
+    provider = DeviceProvider(rm, timeout=timeout, cache=cache)
+
+    if address is None:
+        address = rm.list_resources()
+    if len(address) == 0:
+        return
 
+    # Probe all addresses concurrently and yield them as they resolve
+    with ThreadPoolExecutor(max_workers=len(address)) as executor:
+        futures = {executor.submit(provider, addr): addr for addr in address}
+        for future in as_completed(futures):
+            addr = futures[future]
+            try:
+                dev = future.result()
+            except visa.VisaIOError as e:
+                logger.warning('Device "%s" could not be opened. (%s)',
+                               addr, e)
+                continue
+            yield addr, dev
+
+
+def get_devices(timeout=PROBE_TIMEOUT, cache_path=DEFAULT_CACHE_PATH):
+    rm = visa.ResourceManager()
     address = rm.list_resources()
-    return {addr:provider(addr) for addr in address}
+    cache = None if cache_path is None else IdentificationCache(cache_path)
+
+    devices = dict(iter_devices(address, timeout, rm, cache))
+    if cache is not None:
+        try:
+            cache.save()
+        except OSError as e:
+            logger.warning('Failed to save device cache "%s". (%s)',
+                           cache_path, e)
+    return {addr:devices[addr] for addr in address if addr in devices}
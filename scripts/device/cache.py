@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import threading
+
+from .registry import load_driver
+
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache',
+                                  'my_measurements_scripts', 'devices.json')
+
+
+def _get_model_name(model):
+    if model is None:
+        return None
+    return '%s:%s' % (model.__module__, model.__qualname__)
+
+
+class IdentificationCache():
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self._entries = dict()
+        self._modified = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            entries = dict()
+        except (OSError, ValueError) as e:
+            logger.warning('Failed to load device cache "%s". (%s)',
+                           self.path, e)
+            entries = dict()
+
+        with self._lock:
+            self._entries = entries
+            self._modified = False
+
+    def save(self):
+        with self._lock:
+            if not self._modified:
+                return
+            entries = dict(self._entries)
+            self._modified = False
+
+        dirname = os.path.dirname(self.path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        # Replace atomically not to leave a broken cache file
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def get(self, address):
+        with self._lock:
+            entry = self._entries.get(address)
+        if entry is None:
+            return None
+
+        model = entry.get('model')
+        try:
+            model = None if model is None else load_driver(model)
+        except (ImportError, AttributeError, ValueError) as e:
+            logger.warning('Cached driver of "%s" is not available. (%s)',
+                           address, e)
+            return None
+        return entry.get('idn', ''), model
+
+    def set(self, address, idn, model):
+        entry = dict(idn=idn, model=_get_model_name(model))
+        with self._lock:
+            if self._entries.get(address) != entry:
+                self._entries[address] = entry
+                self._modified = True
+
+    def discard(self, address):
+        with self._lock:
+            if self._entries.pop(address, None) is not None:
+                self._modified = True
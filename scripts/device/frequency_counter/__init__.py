@@ -1,3 +1,6 @@
 # -*- coding: utf-8 -*-
 from .interface import FrequencyCounter
-from .pendulum_cnt90 import Pendulum_CNT90
+from ..registry import register_driver
+
+register_driver('PENDULUM, CNT-9',
+                __name__ + '.pendulum_cnt90:Pendulum_CNT90')
@@ -9,3 +9,6 @@ class FrequencyCounter(DeviceHandler):
     @abstractmethod
     def get(self):
         raise NotImplementedError
+
+    async def async_get(self):
+        return await self._run_async(self.get)
@@ -1,7 +1,48 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import threading
 from abc import ABCMeta, abstractmethod
+from functools import partial
 
-from pyvisa import Resource
+import numpy as np
+from pyvisa import Resource, rname
+from pyvisa.util import parse_ieee_block_header
+
+# Logging
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+# Bus name -> lock serializing the commands on the bus
+_bus_locks = dict()
+_bus_locks_guard = threading.Lock()
+
+
+def _get_bus_name(address):
+    try:
+        info = rname.parse_resource_name(address)
+    except rname.InvalidResourceName:
+        return address
+
+    # Devices on one GPIB board share the bus
+    if info.interface_type == 'GPIB':
+        return 'GPIB%s' % info.board
+    return address
+
+
+def get_bus_lock(address):
+    bus = _get_bus_name(address)
+    with _bus_locks_guard:
+        if bus not in _bus_locks:
+            _bus_locks[bus] = threading.RLock()
+        return _bus_locks[bus]
+
+
+def _get_setting_key(cmd):
+    # ":function:impedance:type?" -> "function:impedance:type"
+    key = ' '.join(cmd.replace('?', ' ').split())
+    return key.lstrip(':').lower()
 
 
 class DeviceHandler(metaclass=ABCMeta):
@@ -9,29 +50,191 @@ class DeviceHandler(metaclass=ABCMeta):
         assert isinstance(resource, Resource), \
             'Not a visa.resource.Resource instance.'
         self._inst = resource
+        self._bus_lock = get_bus_lock(resource.resource_name)
+        # Keep a command sequence of this device in order
+        self._lock = threading.RLock()
+        # Configuration values last written or read (None: disabled)
+        self._settings = None
 
     def write(self, cmd, *args):
         if args:
             cmd = cmd % args
 
-        self._inst.write(cmd)
+        with self._bus_lock:
+            self._inst.write(cmd)
 
     def query(self, cmd, *args):
         if args:
             cmd = cmd % args
 
-        if not cmd.endswith('?'):
+        if '?' not in cmd:
             cmd += '?'
-        return self._inst.query(cmd)[:-1]
+        with self._bus_lock:
+            return self._inst.query(cmd)[:-1]
+
+    def _query_compound(self, cmd):
+        return self.query(cmd)
+
+    def _split_response(self, res):
+        return [item.strip() for item in res.split(';')]
+
+    def query_many(self, cmds, types=None):
+        # Send all queries as one compound message
+        cmds = [cmd if '?' in cmd else cmd + '?' for cmd in cmds]
+        values = self._split_response(self._query_compound(';'.join(cmds)))
+
+        if len(values) != len(cmds):
+            err_msg = 'Unexpected number of responses: %d (expected %d)' % \
+                      (len(values), len(cmds))
+            logger.error(err_msg)
+            raise ValueError(err_msg)
+
+        if types is not None:
+            values = [fn(v) for fn, v in zip(types, values)]
+        return tuple(values)
 
     def query_binary_values(self, cmd, *args, **kwargs):
         if args:
             cmd = cmd % args
 
-        if not cmd.endswith('?'):
+        if '?' not in cmd:
+            cmd += '?'
+
+        with self._bus_lock:
+            return self._inst.query_binary_values(cmd, **kwargs)
+
+    def read_binary_block(self):
+        block = self._inst.read_raw()
+        offset, length = parse_ieee_block_header(block)
+        termination = self._inst.read_termination or ''
+
+        if length < 0:
+            # Indefinite length block ("#0") lasts until the termination
+            length = len(block) - offset
+            if termination and block.endswith(termination.encode()):
+                length -= len(termination)
+        elif len(block) < offset + length:
+            # Reading stopped at a termination character inside the data
+            missing = offset + length + len(termination) - len(block)
+            block += self._inst.read_bytes(missing)
+
+        return memoryview(block)[offset:offset + length]
+
+    def query_binary_block(self, cmd, *args):
+        if args:
+            cmd = cmd % args
+
+        if '?' not in cmd:
             cmd += '?'
 
-        return self._inst.query_binary_values(cmd, **kwargs)
+        with self._bus_lock:
+            self._inst.write(cmd)
+            return self.read_binary_block()
+
+    def query_binary_array(self, cmd, *args, dtype='<i2', out=None):
+        # Decoded array is a read-only view of the received block
+        data = np.frombuffer(self.query_binary_block(cmd, *args), dtype=dtype)
+        if out is None:
+            return data
+
+        out = out[:data.shape[0]]
+        out[:] = data
+        return out
+
+    def enable_settings_cache(self, enable=True):
+        self._settings = dict() if enable else None
+
+    def invalidate_settings(self, *keys):
+        if self._settings is None:
+            return
+
+        if len(keys) == 0:
+            self._settings.clear()
+        for key in keys:
+            self._settings.pop(_get_setting_key(key), None)
+
+    def cached_setting(self, cmd):
+        # Cached value of the setting (None: not cached)
+        if self._settings is None:
+            return None
+        return self._settings.get(_get_setting_key(cmd))
+
+    def cache_setting(self, cmd, value):
+        # Store a value read together with other queries
+        if self._settings is not None:
+            self._settings[_get_setting_key(cmd)] = value
+
+    def write_setting(self, cmd, *args, key=None):
+        if args:
+            cmd = cmd % args
+
+        cmd = cmd.strip()
+        if key is None:
+            key = cmd.partition(' ')[0]
+        # Remaining parameters are the value ("DDEF 1,0" -> "DDEF 1", "0")
+        value = cmd[len(key):] if cmd.lower().startswith(key.lower()) \
+                else cmd
+        value = value.strip(' ,')
+        key = _get_setting_key(key)
+
+        # Skip the command which does not change anything
+        if self._settings is not None and self._settings.get(key) == value:
+            return
+
+        self.write(cmd)
+        if self._settings is not None:
+            self._settings[key] = value
+
+    def query_setting(self, cmd, *args, key=None):
+        if args:
+            cmd = cmd % args
+
+        key = _get_setting_key(cmd if key is None else key)
+        if self._settings is not None and key in self._settings:
+            return self._settings[key]
+
+        value = self.query(cmd)
+        if self._settings is not None:
+            self._settings[key] = value
+        return value
+
+    def query_settings(self, cmds, types=None):
+        if self._settings is None:
+            return self.query_many(cmds, types)
+
+        # Query only uncached values at once
+        keys = [_get_setting_key(cmd) for cmd in cmds]
+        missing = [(cmd, key) for cmd, key in zip(cmds, keys)
+                   if key not in self._settings]
+        if len(missing) > 0:
+            values = self.query_many([cmd for cmd, _ in missing])
+            for (_, key), value in zip(missing, values):
+                self._settings[key] = value
+
+        values = [self._settings[key] for key in keys]
+        if types is not None:
+            values = [fn(v) for fn, v in zip(types, values)]
+        return tuple(values)
+
+    def _call_locked(self, fn, *args, **kwargs):
+        with self._lock:
+            return fn(*args, **kwargs)
+
+    async def _run_async(self, fn, *args, **kwargs):
+        # Blocking I/O runs on a worker thread, serialized by the bus lock
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, partial(self._call_locked, fn, *args, **kwargs))
+
+    async def async_write(self, cmd, *args):
+        return await self._run_async(self.write, cmd, *args)
+
+    async def async_query(self, cmd, *args):
+        return await self._run_async(self.query, cmd, *args)
+
+    async def async_query_binary_values(self, cmd, *args, **kwargs):
+        return await self._run_async(self.query_binary_values,
+                                     cmd, *args, **kwargs)
 
     @property
     def address(self):
@@ -1,3 +1,6 @@
 # -*- coding: utf-8 -*-
 from .interface import LCRMeter
-from .hp_4284a import HP_4284A
+from ..registry import register_driver
+
+register_driver('HEWLETT-PACKARD,4284A',
+                __name__ + '.hp_4284a:HP_4284A')
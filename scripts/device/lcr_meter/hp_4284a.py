@@ -8,8 +8,6 @@ logger.addHandler(NullHandler())
 
 
 class HP_4284A(LCRMeter):
-    IDN_STR = 'HEWLETT-PACKARD,4284A'
-
     def set_mode(self, mode, is_big_value=False):
         if type(mode) == str:
             mode = self.Mode(mode.lower())
@@ -23,11 +21,18 @@ class HP_4284A(LCRMeter):
         else:
             raise ValueError
 
-        self.write(':function:impedance:type %s' % mode_str)
+        self.write_setting(':function:impedance:type %s', mode_str)
 
     def get(self):
-        mode = self.query(':function:impedance:type?')
-        data = self.query(':fetch?').split(',')[:2]
+        mode = self.cached_setting(':function:impedance:type?')
+        if mode is None:
+            # Read the function type and the data by one compound query
+            mode, data = self.query_many((':function:impedance:type?',
+                                          ':fetch?'))
+            self.cache_setting(':function:impedance:type?', mode)
+        else:
+            data = self.query(':fetch?')
+        data = data.split(',')[:2]
 
         # Use first parameter
         if mode[:3] in ('CSD', 'CPD', 'LPD', 'LSD'):
@@ -18,3 +18,6 @@ class LCRMeter(DeviceHandler):
     @abstractmethod
     def get(self):
         raise NotImplementedError
+
+    async def async_get(self):
+        return await self._run_async(self.get)
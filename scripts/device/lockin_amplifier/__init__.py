@@ -1,4 +1,8 @@
 # -*- coding: utf-8 -*-
 from .interface import LockinAmplifier
-from .nf_li5640 import NF_LI5640
-from .stanford_sr844 import Stanford_SR844
+from ..registry import register_driver
+
+register_driver('NF-ELECTRONIC-INSTRUMENTS,LI5640',
+                __name__ + '.nf_li5640:NF_LI5640')
+register_driver('Stanford_Research_Systems,SR844',
+                __name__ + '.stanford_sr844:Stanford_SR844')
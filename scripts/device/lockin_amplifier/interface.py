@@ -44,3 +44,9 @@ class LockinAmplifier(DeviceHandler, metaclass=ABCMeta):
     @abstractmethod
     def get_frequency(self):
         raise NotImplementedError()
+
+    async def async_get_amplitude(self):
+        return await self._run_async(self.get_amplitude)
+
+    async def async_get_frequency(self):
+        return await self._run_async(self.get_frequency)
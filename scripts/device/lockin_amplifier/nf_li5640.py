@@ -25,8 +25,6 @@ AVAILABLE_CURRENT_RANGE = (     -1, 5.0e-15, 1.0e-14, 2.0e-14, 5.0e-14,
 
 
 class NF_LI5640(LockinAmplifier):
-    IDN_STR = 'NF-ELECTRONIC-INSTRUMENTS,LI5640'
-
     class OutputType(IntEnum):
         LINE = 0
         DATA1 = 1
@@ -55,13 +53,13 @@ class NF_LI5640(LockinAmplifier):
     def set_variable_type(self, var_type, _=None):
         # NOTE: Channel argument is not available
         if var_type == self.VariableType.X:
-            self.write('DDEF 1,0')
+            self.write_setting('DDEF 1,0', key='DDEF 1')
         elif var_type == self.VariableType.Y:
-            self.write('DDEF 2,0')
+            self.write_setting('DDEF 2,0', key='DDEF 2')
         elif var_type == self.VariableType.R:
-            self.write('DDEF 1,1')
+            self.write_setting('DDEF 1,1', key='DDEF 1')
         elif var_type == self.VariableType.THETA:
-            self.write('DDEF 2,1')
+            self.write_setting('DDEF 2,1', key='DDEF 2')
         else:
             err_msg = 'Unexpected variable type: %s' % var_type
             logger.error(err_msg)
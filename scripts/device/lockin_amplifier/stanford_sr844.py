@@ -14,18 +14,16 @@ AVAILABLE_VOLTAGE_RANGE = (1.0e-7, 3.0e-7, 1.0e-6, 3.0e-6, 1.0e-5, 3.0e-5,
 
 
 class Stanford_SR844(LockinAmplifier):
-    IDN_STR = 'Stanford_Research_Systems,SR844'
-
     def set_variable_type(self, var_type, _=None):
         # NOTE: Channel argument is not available
         if var_type == self.VariableType.X:
-            self.write('DDEF 1,0')
+            self.write_setting('DDEF 1,0', key='DDEF 1')
         elif var_type == self.VariableType.Y:
-            self.write('DDEF 2,0')
+            self.write_setting('DDEF 2,0', key='DDEF 2')
         elif var_type == self.VariableType.R:
-            self.write('DDEF 1,1')
+            self.write_setting('DDEF 1,1', key='DDEF 1')
         elif var_type == self.VariableType.THETA:
-            self.write('DDEF 2,1')
+            self.write_setting('DDEF 2,1', key='DDEF 2')
         else:
             err_msg = 'Unexpected variable type: %s' % var_type
             logger.error(err_msg)
@@ -65,7 +63,7 @@ class Stanford_SR844(LockinAmplifier):
         raise NotImplementedError()
 
     def get_amplitude(self):
-        return tuple([float(self.query('OUTR? %d', i)) for i in (1, 2)])
+        return self.query_many(('OUTR? 1', 'OUTR? 2'), (float, float))
 
     def get_frequency(self):
         return float(self.query('FREQ?'))
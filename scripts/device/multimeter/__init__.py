@@ -1,4 +1,8 @@
 # -*- coding: utf-8 -*-
 from .interface import Multimeter
-from .keithley_2000 import Keithley2000
-from .agilent_34410a import Agilent_34410A
+from ..registry import register_driver
+
+register_driver('KEITHLEY INSTRUMENTS INC.,MODEL 2000,',
+                __name__ + '.keithley_2000:Keithley2000')
+register_driver('Agilent Technologies,3441',
+                __name__ + '.agilent_34410a:Agilent_34410A')
@@ -2,8 +2,6 @@
 from .interface import Multimeter
 
 class Agilent_34410A(Multimeter):
-    IDN_STR = 'Agilent Technologies,3441'
-
     def get_voltage(self, AC=False):
         cmd = 'measure:voltage%s' % (':AC?' if AC else '?')
         return float(self.query(cmd))
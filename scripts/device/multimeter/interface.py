@@ -16,3 +16,12 @@ class Multimeter(DeviceHandler, metaclass=ABCMeta):
     @abstractmethod
     def get_resistance(self):
         raise NotImplementedError()
+
+    async def async_get_voltage(self, *args, **kwargs):
+        return await self._run_async(self.get_voltage, *args, **kwargs)
+
+    async def async_get_current(self, *args, **kwargs):
+        return await self._run_async(self.get_current, *args, **kwargs)
+
+    async def async_get_resistance(self, *args, **kwargs):
+        return await self._run_async(self.get_resistance, *args, **kwargs)
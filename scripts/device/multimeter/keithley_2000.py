@@ -2,8 +2,6 @@
 from .interface import Multimeter
 
 class Keithley2000(Multimeter):
-    IDN_STR = 'KEITHLEY INSTRUMENTS INC.,MODEL 2000,'
-
     def get_voltage(self, AC=False):
         cmd = 'measure:voltage%s' % (':AC?' if AC else '?')
         return float(self.query(cmd))
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
-import visa
+from .interface import Oscilloscope, Waveform
+from ..registry import register_driver
 
-from .interface import Oscilloscope
-from .lecroy_lt342l import Lecroy_LT342L
-from .yokogawa_dl9140l import Yokogawa_DL9140L
+register_driver(('*IDN LECROY,LT342L', 'LECROY,LT342L'),
+                __name__ + '.lecroy_lt342l:Lecroy_LT342L')
+register_driver('YOKOGAWA,701311',
+                __name__ + '.yokogawa_dl9140l:Yokogawa_DL9140L')
@@ -1,9 +1,44 @@
 # -*- coding: utf-8 -*-
 from abc import ABCMeta, abstractmethod
 
+import numpy as np
+
+from adc import scale_codes
 from ..interface import DeviceHandler
 
 
+class Waveform():
+    # Uniformly sampled waveform: time = t0 + arange(n) * dt
+    # Raw ADC codes are stored with volts = codes * scale + offset
+    def __init__(self, values, dt, t0=0.0, scale=None, offset=None):
+        self.values = values
+        self.dt = dt
+        self.t0 = t0
+        self.scale = scale
+        self.offset = offset
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    @property
+    def raw(self):
+        return self.scale is not None
+
+    @property
+    def time(self):
+        return self.t0 + np.arange(len(self)) * self.dt
+
+    @property
+    def volts(self):
+        if not self.raw:
+            return self.values
+        return scale_codes(self.values, self.scale, self.offset)
+
+    def __iter__(self):
+        # Unpack as (ts, vs)
+        return iter((self.time, self.volts))
+
+
 class Oscilloscope(DeviceHandler, metaclass=ABCMeta):
 
     @abstractmethod
@@ -15,5 +50,8 @@ class Oscilloscope(DeviceHandler, metaclass=ABCMeta):
         raise NotImplementedError()
 
     @abstractmethod
-    def get_data(self):
+    def get_data(self, raw=False):
         raise NotImplementedError()
+
+    async def async_get_data(self, raw=False):
+        return await self._run_async(self.get_data, raw)
@@ -3,7 +3,7 @@ import struct
 
 import numpy as np
 
-from .interface import Oscilloscope
+from .interface import Oscilloscope, Waveform
 
 # Logging
 from logging import getLogger, NullHandler
@@ -14,8 +14,6 @@ logger.addHandler(NullHandler())
 CHANNEL_LABELS = ('C1','C2', 'TA', 'TB', 'TC', 'TD')
 
 class Lecroy_LT342L(Oscilloscope):
-    IDN_STR = ('*IDN LECROY,LT342L', 'LECROY,LT342L')
-
     def __init__(self, resource):
         super().__init__(resource)
 
@@ -27,49 +25,33 @@ class Lecroy_LT342L(Oscilloscope):
         self.write('TRIG_MODE NORM')
 
         for ch in CHANNEL_LABELS[-4:]:
-            if self.query('%s:TRACE?', ch) == 'ON':
+            if self.query_setting('%s:TRACE?', ch) == 'ON':
                 self.write('%s:FUNCTION_RESET', ch)
 
     def stop(self):
         self.write('TRIG_MODE STOP')
 
-    def get_data_with_ch(self, ch):
-        vs = self.query_binary_values('%s:WAVEFORM? DAT1', ch,
-                                      datatype='h',
-                                      is_big_endian=True)
-        vs = np.asarray(vs, dtype=np.float32)
-
-        meta = self.query_binary_values('%s:WAVEFORM? DESC', ch,
-                                        datatype='c')
-        # Read header byte (156--160) as float
-        vdiv = struct.unpack('f', b''.join(meta[156:160])[::-1])[0]
-        # Read header byte (160--164) as float
-        voffset = struct.unpack('f', b''.join(meta[160:164])[::-1])[0]
-        # Read header byte (176--180) as float
-        dt = struct.unpack('f', b''.join(meta[176:180])[::-1])[0]
+    def get_data_with_ch(self, ch, raw=False):
+        codes = self.query_binary_array('%s:WAVEFORM? DAT1', ch,
+                                        dtype='>i2')
+        desc = self.query_binary_block('%s:WAVEFORM? DESC', ch)
 
-        vs = vs * vdiv + voffset
-        ts = np.arange(0, vs.shape[0] * dt, dt)
+        # Read header byte (156--164) as big endian float (vdiv, voffset)
+        vdiv, voffset = struct.unpack_from('>2f', desc, 156)
+        # Read header byte (176--180) as big endian float
+        dt, = struct.unpack_from('>f', desc, 176)
 
-        return (ts, vs)
+        wf = Waveform(codes, dt, scale=vdiv, offset=voffset)
+        return wf if raw else Waveform(wf.volts, dt)
 
-    def get_data(self):
-        tdiv = self.query('TIME_DIV?')
+    def get_data(self, raw=False):
+        tdiv, *traces = self.query_settings(
+            ['TIME_DIV?'] + ['%s:TRACE?' % ch for ch in CHANNEL_LABELS])
         data = dict()
-        for ch in CHANNEL_LABELS:
-            if self.query('%s:TRACE?', ch) == 'OFF':
+        for ch, trace in zip(CHANNEL_LABELS, traces):
+            if trace == 'OFF':
                 data[ch] = np.zeros((2, 0))
             else:
-                data[ch] = self.get_data_with_ch(ch)
+                data[ch] = self.get_data_with_ch(ch, raw)
 
         return data
-
-    def query(self, cmd, *args):
-        if args:
-            cmd = cmd % args
-        return self._inst.query(cmd)[:-1]
-
-    def query_binary_values(self, cmd, *args, **kwargs):
-        if args:
-            cmd = cmd % args
-        return self._inst.query_binary_values(cmd, **kwargs)
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
-from .interface import Oscilloscope
+import numpy as np
+
+from .interface import Oscilloscope, Waveform
 
 # Logging
 from logging import getLogger, NullHandler
@@ -7,9 +9,12 @@ logger = getLogger(__name__)
 logger.addHandler(NullHandler())
 
 
-class Yokogawa_DL9140L(Oscilloscope):
-    IDN_STR = 'YOKOGAWA,701311'
+# Waveform bits -> little endian integer type
+WAVEFORM_DTYPES = {16: '<i2', 32: '<i4', 64: '<i8'}
+CHANNELS = (1, 2, 3, 4)
 
+
+class Yokogawa_DL9140L(Oscilloscope):
     def __init__(self, resource):
         super().__init__(resource)
 
@@ -26,46 +31,34 @@ class Yokogawa_DL9140L(Oscilloscope):
     def stop(self):
         self.write(':stop')
 
-    def _get_data_with_ch(self, ch):
-        bits = int(self.query(':waveform:bits?'))
-
-        if bits == 16:
-            data = self.query_binary_values(':waveform:send?',
-                                            datatype='h',
-                                            is_big_endian=False)
-            data = np.asarray(data, dtype=np.float16)
-        elif bits == 32:
-            data = self.query_binary_values(':waveform:send?',
-                                            datatype='i',
-                                            is_big_endian=False)
-            data = np.asarray(data, dtype=np.float32)
-        elif bits == 64:
-            data = self.query_binary_values(':waveform:send?',
-                                            datatype='q',
-                                            is_big_endian=False)
-            data = np.asarray(data, dtype=np.float64)
-        else:
+    def _get_data_with_ch(self, ch, raw=False):
+        bits, offset, vrange, srate = self.query_many(
+            (':waveform:bits?', ':waveform:offset?',
+             ':waveform:range?', ':waveform:srate?'),
+            (int, float, float, float))
+
+        if bits not in WAVEFORM_DTYPES:
             err_msg = 'Invalid waveform bits: %s' % bits
             logger.error(err_msg)
             raise ValueError(err_msg)
+        codes = self.query_binary_array(':waveform:send?',
+                                        dtype=WAVEFORM_DTYPES[bits])
 
-        offset = float(self.query(':waveform:offset?'))
-        vrange = float(self.query(':waveform:range?'))
-        srate = float(self.query(':waveform:srate?'))
-
-        vs = data * (vrange / 3200) + offset
-        ts = np.linspace(0, vs.shape[0] / srate, srate)
-        return (ts, vs)
+        wf = Waveform(codes, 1.0 / srate, scale=vrange / 3200, offset=offset)
+        return wf if raw else Waveform(wf.volts, 1.0 / srate)
 
-    def get_data(self):
+    def get_data(self, raw=False):
+        displays = self.query_settings([':channel%d:display?' % i
+                                        for i in CHANNELS],
+                                       [int] * len(CHANNELS))
         data = dict()
-        for i in range(4):
-            if int(self.query(':channel:display%d?', i)) != 1:
+        for i, display in zip(CHANNELS, displays):
+            if display != 1:
                 data['ch%d' % i] = np.zeros((2, 0))
                 continue
 
-            self.write(':waveform:trace %d ', i)
-            data['ch%d' % i] = self._get_data_with_ch(i)
+            self.write_setting(':waveform:trace %d', i)
+            data['ch%d' % i] = self._get_data_with_ch(i, raw)
 
         return data
 
@@ -93,3 +86,21 @@ class Yokogawa_DL9140L(Oscilloscope):
             cmd = ':' + cmd
 
         return super().query_binary_values(cmd, *args, **kwargs)
+
+    def query_many(self, cmds, types=None):
+        cmds = [cmd if cmd.startswith(':') else ':' + cmd for cmd in cmds]
+        return super().query_many(cmds, types)
+
+    def _query_compound(self, cmd):
+        # Raw response keeps the order of the sub-queries
+        return super().query(cmd)
+
+    def _split_response(self, res):
+        # "<header> <value>" items, whose headers may be off or repeated
+        return [item.strip().split(' ')[-1] for item in res.split(';')]
+
+    def query_binary_block(self, cmd, *args):
+        if not cmd.startswith(':'):
+            cmd = ':' + cmd
+
+        return super().query_binary_block(cmd, *args)
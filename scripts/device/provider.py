@@ -1,63 +1,91 @@
 # -*- coding: utf-8 -*-
 import pyvisa as visa
-from . import lockin_amplifier
-from . import signal_generator
-from . import oscilloscope
-from . import multimeter
-from . import lcr_meter
-from . import frequency_counter
-from . import temprature_controller
+
+from .registry import registry
 
 from logging import getLogger, NullHandler
 logger = getLogger(__name__)
 logger.addHandler(NullHandler())
 
 
-def _check_model_id(model, idn_str):
-    idn_templates = getattr(model, 'IDN_STR')
+# Timeout (ms) to confirm that a cached device is still at the address
+PING_TIMEOUT = 200
 
-    if isinstance(idn_templates, str):
-        idn_templates = (idn_templates,)
 
-    for template in idn_templates:
-        if idn_str.startswith(template):
-            return True
+class DeviceProvider():
+    def __init__(self, resource_manager=None, timeout=None, cache=None,
+                 drivers=registry):
+        if not isinstance(resource_manager, visa.ResourceManager):
+            resource_manager = visa.ResourceManager()
+        self._rm = resource_manager
+        self._drivers = drivers
+        # Timeout (ms) applied only while "*IDN?" is queried
+        self._timeout = timeout
+        self._cache = cache
 
-    return False
+    def _query_idn(self, resource, timeout):
+        default_timeout = resource.timeout
+        if timeout is not None:
+            resource.timeout = timeout
 
+        try:
+            return resource.query('*IDN?').strip()
+        finally:
+            resource.timeout = default_timeout
 
-def _get_model_list():
-    models = list()
+    def _create_device(self, address, resource, idn, model):
+        if model is None:
+            logger.info('Unknown device "%s" is found. (%s)', address, idn)
+            return resource
 
-    for module in globals().values():
-        attrs = [getattr(module, attr) for attr in dir(module)]
-        attrs = [attr for attr in attrs if hasattr(attr, 'IDN_STR')]
-        models.extend(attrs)
+        logger.info('Device "%s" is identified. (%s)',
+                    address, model.__name__)
+        return model(resource)
 
-    return models
+    def _check_cache(self, address, resource):
+        cached = self._cache.get(address)
+        if cached is None:
+            return None
 
+        cached_idn, model = cached
+        if len(cached_idn) == 0:
+            # Silent device may be slow or powered on later
+            return None
+        try:
+            idn = self._query_idn(resource, PING_TIMEOUT)
+        except visa.VisaIOError:
+            idn = ""
 
-class DeviceProvider():
-    def __init__(self, resource_manager=None):
-        if not isinstance(resource_manager, visa.ResourceManager):
-            resource_manager = visa.ResourceManager()
-        self._rm = resource_manager
-        self._models = _get_model_list()
+        if idn != cached_idn:
+            logger.info('Device "%s" is changed. (%s -> %s)',
+                        address, cached_idn, idn)
+            return None
+        return idn, model
 
-    def __call__(self, address):
-        resource = self._rm.open_resource(address)
+    def _probe(self, address, resource):
         try:
-            idn = resource.query('*IDN?')
+            idn = self._query_idn(resource, self._timeout)
         except visa.VisaIOError:
             logger.warn('Device "%s" did not return "*IDN?" responce.',
                         address)
             idn = ""
 
-        for model in self._models:
-            if _check_model_id(model, idn):
-                logger.info('Device "%s" is identified. (%s)',
-                            address, model.__name__)
-                return model(resource)
+        model = self._drivers.find(idn)
+        if self._cache is not None:
+            if len(idn) > 0:
+                self._cache.set(address, idn, model)
+            else:
+                # Silent addresses are probed again in the next search
+                self._cache.discard(address)
+        return idn, model
+
+    def __call__(self, address):
+        resource = self._rm.open_resource(address)
+
+        identity = None
+        if self._cache is not None:
+            identity = self._check_cache(address, resource)
+        if identity is None:
+            identity = self._probe(address, resource)
 
-        logger.info('Unknown device "%s" is found. (%s)', address, idn)
-        return resource
+        return self._create_device(address, resource, *identity)
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import bisect
+import importlib
+import threading
+
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+def load_driver(name):
+    module_name, qualname = name.split(':')
+    driver = importlib.import_module(module_name)
+    for attr in qualname.split('.'):
+        driver = getattr(driver, attr)
+    return driver
+
+
+class DriverRegistry():
+    def __init__(self):
+        # Prefix length -> {IDN prefix: driver class or "module:class"}
+        self._index = dict()
+        # Registered prefix lengths in descending order
+        self._lengths = list()
+        self._lock = threading.Lock()
+
+    def register(self, idn_str, driver):
+        if isinstance(idn_str, str):
+            idn_str = (idn_str,)
+
+        with self._lock:
+            for prefix in idn_str:
+                n = len(prefix)
+                if n not in self._index:
+                    self._index[n] = dict()
+                    bisect.insort(self._lengths, -n)
+                elif prefix in self._index[n]:
+                    logger.warning('Driver for "%s" is overwritten.', prefix)
+                self._index[n][prefix] = driver
+
+    def _resolve(self, n, prefix, driver):
+        if not isinstance(driver, str):
+            return driver
+
+        # Import driver module only when the instrument is found
+        driver = load_driver(driver)
+        with self._lock:
+            self._index[n][prefix] = driver
+        return driver
+
+    def find(self, idn):
+        # Longest registered prefix wins
+        for n in self._lengths:
+            n = -n
+            prefix = idn[:n]
+            driver = self._index[n].get(prefix)
+            if driver is not None:
+                return self._resolve(n, prefix, driver)
+
+        return None
+
+
+registry = DriverRegistry()
+
+
+def register_driver(idn_str, driver):
+    registry.register(idn_str, driver)
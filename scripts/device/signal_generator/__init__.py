@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
-import visa
-
 from .interface import SignalGenerator
-from .hp_8648c import HP_8648C
-from .nf_wf1946 import NF_WF1946
+from ..registry import register_driver
+
+register_driver('Hewlett-Packard, 8648',
+                __name__ + '.hp_8648c:HP_8648C')
+register_driver(('NF-ELECTRONIC-INSTRUMENTS,WF1946',
+                 '"NF-ELECTRONIC-INSTRUMENTS,1945'),
+                __name__ + '.nf_wf1946:NF_WF1946')
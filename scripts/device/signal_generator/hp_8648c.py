@@ -3,8 +3,6 @@ from .interface import SignalGenerator
 
 
 class HP_8648C(SignalGenerator):
-    IDN_STR = 'Hewlett-Packard, 8648'
-
     def set_frequency(self, freq):
         self.write('FREQ:CW %e Hz', freq)
 
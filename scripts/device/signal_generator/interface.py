@@ -29,3 +29,9 @@ class SignalGenerator(DeviceHandler, metaclass=ABCMeta):
     @abstractmethod
     def stop(self):
         raise NotImplementedError()
+
+    async def async_get_frequency(self):
+        return await self._run_async(self.get_frequency)
+
+    async def async_get_amplitude(self):
+        return await self._run_async(self.get_amplitude)
@@ -1,2 +1,6 @@
+# -*- coding: utf-8 -*-
 from .interface import TempratureController
-from .cryocon_model62 import Cryocon_Model62
+from ..registry import register_driver
+
+register_driver('Cryocon Model 62',
+                __name__ + '.cryocon_model62:Cryocon_Model62')
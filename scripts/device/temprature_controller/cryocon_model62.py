@@ -2,25 +2,24 @@
 from . import TempratureController
 
 
-class Cryocon_Model62(TempratureController):
-    IDN_STR = 'Cryocon Model 62'
+def _to_temprature(value):
+    try:
+        return float(value)
+    except ValueError:
+        return float('nan')
+
 
+class Cryocon_Model62(TempratureController):
     CH_LBLS = ('A', 'B')
 
     def get_temprature(self):
-        Ts = list()
-        for ch in self.CH_LBLS:
-            T = self.query(':input %s:temper?' % ch)
-            try:
-                Ts.append(float(T))
-            except ValueError:
-                Ts.append(float('nan'))
-
-        return tuple(Ts)
+        cmds = [':input %s:temper?' % ch for ch in self.CH_LBLS]
+        return self.query_many(cmds, [_to_temprature] * len(cmds))
 
     def set_temprature(self, T, target_ch=0):
-        self.write(':loop 1:source CH%s' % self.CH_LBLS[target_ch])
-        self.write(':loop 1:setpt %s' % T)
+        self.write_setting(':loop 1:source CH%s', self.CH_LBLS[target_ch],
+                           key=':loop 1:source')
+        self.write_setting(':loop 1:setpt %s', T, key=':loop 1:setpt')
 
     def start_control(self):
         self.write(':control')
@@ -20,3 +20,6 @@ class TempratureController(DeviceHandler):
     @abstractmethod
     def stop_control(self):
         raise NotImplementedError
+
+    async def async_get_temprature(self):
+        return await self._run_async(self.get_temprature)
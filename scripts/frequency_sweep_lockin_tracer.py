@@ -6,9 +6,10 @@ import math
 
 import numpy as np
 
-from common import write_csv
+from catalog import Catalog, DEFAULT_CATALOG_PATH, run_parameters
+from common import CSVWriter
 from device import SignalGenerator, LockinAmplifier, FrequencyCounter
-from gui import GPIBArgumentParser, MeasureMonitor, DialogMode
+from gui import GPIBArgumentParser, MonitorProcess, DialogMode
 
 from logging import getLogger, INFO, StreamHandler, NullHandler
 root_logger = getLogger()
@@ -31,6 +32,9 @@ def parse_arguments():
                         help='The number of sample frequencies.')
     parser.add_argument('cumulative time', 1.0, type=float,
                         help='Lock-in signal cumulative time. (s)')
+    parser.add_argument('catalog', os.path.abspath(DEFAULT_CATALOG_PATH),
+                        browse_mode=DialogMode.WRITE,
+                        help='SQLite catalog of the measurements.')
     parser.add_device('Lock-in amplifier', LockinAmplifier)
     parser.add_device('Signal generator', SignalGenerator)
     parser.add_device('Frequency counter', FrequencyCounter)
@@ -44,8 +48,18 @@ def main():
 
     outfile = args['output file']
     os.makedirs(os.path.dirname(outfile), exist_ok=True)
-    with open(outfile, 'w') as f:
-        f.write('# frequency / Hz, X / V, Y / V, R / V, Theta / degree\n')
+    writer = CSVWriter(outfile, [
+        CSVWriter.OutputParameter('frequency', fmt='%.6e', unit='Hz'),
+        CSVWriter.OutputParameter('X', fmt='%.4e', unit='V'),
+        CSVWriter.OutputParameter('Y', fmt='%.4e', unit='V'),
+        CSVWriter.OutputParameter('R', fmt='%.4e', unit='V'),
+        CSVWriter.OutputParameter('Theta', fmt='%.2f', unit='degree'),
+    ])
+    with Catalog(args['catalog']) as catalog:
+        catalog.start_run('frequency_sweep_lockin_tracer',
+                          run_parameters(args))
+        catalog.register(outfile, kind='trace',
+                         channels=[p.label for p in writer.params])
 
     freq = np.linspace(args.get('start frequency'),
                        args.get('end frequency'),
@@ -59,11 +73,11 @@ def main():
     lockin.set_variable_type(lockin.VariableType.X)
     lockin.set_variable_type(lockin.VariableType.Y)
 
-    view = MeasureMonitor.MonitorParameter('Frequency / Hz', 'Amplitude / mV',
+    view = MonitorProcess.MonitorParameter('Frequency / Hz', 'Amplitude / mV',
                                            ymul=1.0e3)
     view.add_plot(key='X', line=True, value_fmt='%.3f')
     view.add_plot(key='Y', line=True, marker='D', value_fmt='%.3f')
-    monitor = MeasureMonitor(view)
+    monitor = MonitorProcess(view)
 
     sig_gen.set_frequency(freq[0])
     sig_gen.start()
@@ -81,12 +95,12 @@ def main():
         if counter is not None:
             f = counter.get()
 
-        with open(outfile, 'a') as fs:
-            fs.write('%.6e, %.4e, %.4e, %.4e, %.2f\n' % (f, x, y, r, theta))
+        writer(dict(frequency=f, X=x, Y=y, R=r, Theta=theta))
 
         # Update monitor
         monitor.update(((f, x), (f, y)))
     sig_gen.stop()
+    writer.close()
     monitor.finalize()
 
 if __name__ == '__main__':
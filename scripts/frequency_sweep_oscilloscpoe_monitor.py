@@ -5,7 +5,9 @@ import time
 
 import numpy as np
 
-from common import write_csv
+from archive import WaveformArchive, check_output_format
+from catalog import Catalog, DEFAULT_CATALOG_PATH, run_parameters
+from common import AsyncWriter, write_csv, waveform_batch
 from device import Oscilloscope, SignalGenerator
 from gui import GPIBArgumentParser, DialogMode
 
@@ -30,6 +32,12 @@ def parse_arguments():
                         help='The number of sample frequencies.')
     parser.add_argument('cumulative time', 1.0, type=float,
                         help='Oscilloscope signal cumlative time. (s)')
+    parser.add_argument('output format', 'csv', help='csv or archive')
+    parser.add_argument('raw waveform', 0, type=int,
+                        help='1: store ADC codes with scale and offset')
+    parser.add_argument('catalog', os.path.abspath(DEFAULT_CATALOG_PATH),
+                        browse_mode=DialogMode.WRITE,
+                        help='SQLite catalog of the measurements.')
     parser.add_device('oscilloscope', Oscilloscope)
     parser.add_device('signal generator', SignalGenerator)
 
@@ -51,34 +59,47 @@ def main():
                        args.get('sample frequency'), endpoint=True)
     wait_time = args.get('cumulative time')
 
-    for f in freq:
-        logger.info('Set frequency: %.4e Hz' % f)
-        sig.set_frequency(f)
-        sig.start()
-        osc.start()
-
-        time.sleep(wait_time)
-
-        osc.stop()
-        sig.stop()
-
-        data = osc.get_data()
-
-        labels = list()
-        columns = list()
-        for label, v in data.items():
-            if v[0].shape[0] == 0:
-                continue
-            if 'time' not in labels:
-                labels.append('time')
-                columns.append(v[0])
-            labels.append(label)
-            columns.append(v[1])
-        comments = ('Frequency: %.4e Hz' % f,
-                    'Cumulative time: %.2f s' % wait_time)
-
-        filename = 'osciiloscope_monitor_%.5e_Hz.dat' % f
-        write_csv(os.path.join(dst_dir, filename), columns, labels, comments)
+    output_format = args['output format']
+    check_output_format(output_format)
+    raw = bool(args['raw waveform'])
+    archive_path = os.path.join(dst_dir, 'oscilloscope.wfa')
+    if output_format == 'archive':
+        writer = WaveformArchive(archive_path)
+    else:
+        writer = write_csv
+
+    catalog = Catalog(args['catalog'])
+    catalog.start_run('frequency_sweep_oscilloscpoe_monitor',
+                      run_parameters(args))
+
+    # Files are written on a background thread
+    with AsyncWriter(writer) as writer, catalog:
+        for i, f in enumerate(freq):
+            logger.info('Set frequency: %.4e Hz' % f)
+            sig.set_frequency(f)
+            sig.start()
+            osc.start()
+
+            time.sleep(wait_time)
+
+            osc.stop()
+            sig.stop()
+
+            batch = waveform_batch(osc.get_data(raw))
+
+            meta = dict(acquisition=i, frequency=f,
+                        cumulative_time=wait_time)
+            if output_format == 'archive':
+                path = archive_path
+                writer(batch, meta)
+            else:
+                comments = ('Frequency: %.4e Hz' % f,
+                            'Cumulative time: %.2f s' % wait_time)
+                filename = 'osciiloscope_monitor_%.5e_Hz.dat' % f
+                path = os.path.join(dst_dir, filename)
+                writer(path, batch, comments=comments)
+            catalog.register(path, kind='frequency sweep', record=i,
+                             frequency=f, channels=batch.labels, meta=meta)
 
 
 if __name__ == '__main__':
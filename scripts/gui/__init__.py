@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
 from .graphical_argument_parser import GraphicalArgumentParser
 from .gpib_argument_parser import GPIBArgumentParser
-from .monitor import MeasureMonitor
+from .monitor import MeasureMonitor, MonitorProcess
 from .browse_button import DialogMode
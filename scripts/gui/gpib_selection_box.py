@@ -3,7 +3,7 @@ import sys
 
 import tkinter as tk
 from tkinter import ttk
-from visa import Resource
+from pyvisa import Resource
 from collections import OrderedDict
 
 sys.path.append('..')
@@ -1,22 +1,147 @@
 # -*- coding: utf-8 -*-
 import math
+import time
+import queue
+import multiprocessing
 from functools import reduce
 import numpy as np
 import matplotlib.pyplot as plt
 
 
+class _RingBuffer():
+    # Points (x, y) kept in a contiguous region of a preallocated array.
+    # A bounded buffer has room for 2 * maxlen points and moves the last
+    # points to the head when it is full; an unbounded one doubles its size.
+    def __init__(self, maxlen=None, capacity=1024):
+        self.maxlen = maxlen
+        if maxlen is not None:
+            capacity = 2 * maxlen
+        self._data = np.empty((capacity, 2))
+        self._start = 0
+        self._end = 0
+        self._reset_limits()
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def points(self):
+        return self._data[self._start:self._end]
+
+    @property
+    def xs(self):
+        return self._data[self._start:self._end, 0]
+
+    @property
+    def ys(self):
+        return self._data[self._start:self._end, 1]
+
+    def clear(self):
+        self._start = 0
+        self._end = 0
+        self._reset_limits()
+
+    def _reset_limits(self):
+        # Running extrema of (x, y)
+        self.lower = np.full(2, np.inf)
+        self.upper = np.full(2, -np.inf)
+        # Extrema of sorted columns are their first and last points
+        self._sorted = np.ones(2, dtype=bool)
+
+    def _is_stale(self, n):
+        # Whether evicted points may be the current extrema
+        if self.maxlen is None:
+            return False
+        evicted = self.points[:max(0, len(self) + n - self.maxlen)]
+        if evicted.shape[0] == 0:
+            return False
+        return np.any(~self._sorted & (np.any(evicted == self.lower, axis=0) |
+                                       np.any(evicted == self.upper, axis=0)))
+
+    def _update_limits(self, points, stale):
+        was_sorted = self._sorted.copy()
+        if len(self) > len(points):
+            last = self._data[self._end - len(points) - 1]
+            self._sorted &= points[0] >= last
+        self._sorted &= np.all(np.diff(points, axis=0) >= 0, axis=0)
+
+        # Running extrema of a column which became unsorted are not valid
+        if stale or np.any(was_sorted != self._sorted):
+            # Recompute only when an extremum was evicted
+            self.lower = np.fmin.reduce(self.points, axis=0)
+            self.upper = np.fmax.reduce(self.points, axis=0)
+        else:
+            self.lower = np.fmin(self.lower, np.fmin.reduce(points, axis=0))
+            self.upper = np.fmax(self.upper, np.fmax.reduce(points, axis=0))
+        self.lower = np.where(self._sorted, self.points[0], self.lower)
+        self.upper = np.where(self._sorted, self.points[-1], self.upper)
+
+    def extend(self, xs, ys):
+        n = xs.shape[0]
+        if n == 0:
+            return
+        if self.maxlen is not None and n >= self.maxlen:
+            xs, ys = xs[-self.maxlen:], ys[-self.maxlen:]
+            n = self.maxlen
+            self.clear()
+        stale = self._is_stale(n)
+
+        capacity = self._data.shape[0]
+        if self._end + n > capacity:
+            if self.maxlen is None:
+                size = len(self)
+                data = np.empty((max(capacity * 2, size + n), 2))
+                data[:size] = self.points
+                self._data = data
+            else:
+                size = min(len(self), self.maxlen - n)
+                self._data[:size] = self._data[self._end - size:self._end]
+            self._start = 0
+            self._end = size
+
+        self._data[self._end:self._end + n, 0] = xs
+        self._data[self._end:self._end + n, 1] = ys
+        self._end += n
+        if self.maxlen is not None and len(self) > self.maxlen:
+            self._start = self._end - self.maxlen
+        self._update_limits(self._data[self._end - n:self._end], stale)
+
+
+def _minmax_indices(ys, n_points):
+    # Indices of the minimum and maximum of each bucket in index order,
+    # which keep the envelope of the data with about n_points points
+    n = ys.shape[0]
+    n_buckets = max(1, n_points // 2)
+    if n <= n_points or n_buckets >= n:
+        return None
+    size = math.ceil(n / n_buckets)
+    m = n // size * size
+    buckets = ys[:m].reshape(-1, size)
+    offsets = np.arange(0, m, size)
+    indices = [[0, n - 1], offsets + np.argmin(buckets, axis=1),
+               offsets + np.argmax(buckets, axis=1)]
+    if m < n:
+        indices.append([m + np.argmin(ys[m:]), m + np.argmax(ys[m:])])
+    return np.unique(np.concatenate(indices))
+
+
 class _PlotManager():
     def __init__(self, ax, *, key, color, line, marker,
-                 maxlen, reset_on_update, text_pos, value_fmt):
+                 maxlen, reset_on_update, text_pos, value_fmt,
+                 display_points=None):
+        self._ax = ax
         self._line = line
+        self.display_points = display_points
         if key is None:
             self._text_fmt = value_fmt
         else:
             self._text_fmt = '%s: %s' % (key, value_fmt)
         self.reset_on_update = reset_on_update
         self.maxlen = maxlen
-        self._xs = list()
-        self._ys = list()
+        self._buffer = _RingBuffer(maxlen)
+        # Plotted data is renewed only when a frame is drawn
+        self._changed = False
+        self._n_drawn = None
 
         if line:
             self.plot, = ax.plot(self._xs, self._ys,
@@ -32,37 +157,69 @@ class _PlotManager():
                                 color='gray',
                                 transform=ax.transAxes)
 
+    @property
+    def _xs(self):
+        return self._buffer.xs
+
+    @property
+    def _ys(self):
+        return self._buffer.ys
+
+    def __len__(self):
+        return len(self._buffer)
+
     @property
     def xlim(self):
-        return min(self._xs), max(self._xs)
+        return self._buffer.lower[0], self._buffer.upper[0]
 
     @property
     def ylim(self):
-        return min(self._ys), max(self._ys)
+        return self._buffer.lower[1], self._buffer.upper[1]
 
-    def __call__(self, xs, ys):
-        if xs.shape[0] == 0 or ys.shape[0] == 0:
-            return
+    def _n_display(self):
+        if self.display_points == 'auto':
+            # Two points (min and max) per pixel column
+            return 2 * max(1, int(self._ax.bbox.width))
+        return self.display_points
 
-        data = list()
-        for s1, s2 in zip((self._xs, self._ys), (xs, ys)):
-            if self.reset_on_update:
-                data.append(s2)
-            else:
-                s = np.concatenate([s1, s2])
-                if self.maxlen is not None:
-                    s = s[-self.maxlen:]
-                data.append(s)
-        self._xs, self._ys = data[0], data[1]
+    def sync(self):
+        # Pass the data to the plot before drawing. The decimated view is
+        # kept until the buffer or the number of display points changes.
+        n_display = self._n_display()
+        if not self._changed and n_display == self._n_drawn:
+            return
+        self._changed = False
+        self._n_drawn = n_display
 
+        # Views of the buffer are passed to the plot
+        points = self._buffer.points
+        if n_display is not None:
+            indices = _minmax_indices(self._ys, n_display)
+            if indices is not None:
+                points = points[indices]
         if self._line:
-            self.plot.set_data(self._xs, self._ys)
+            self.plot.set_data(points[:, 0], points[:, 1])
         else:
-            self.plot.set_offsets(np.asarray([self._xs, self._ys]).T)
+            self.plot.set_offsets(points)
+
+    def __call__(self, xs, ys):
+        if xs.shape[0] == 0 or ys.shape[0] == 0:
+            return
+
+        if self.reset_on_update:
+            self._buffer.clear()
+        self._buffer.extend(xs, ys)
+        self._changed = True
 
         if self.text is not None:
             self.text.set_text(self._text_fmt % self._ys[-1])
 
+    @property
+    def artists(self):
+        if self.text is None:
+            return [self.plot]
+        return [self.plot, self.text]
+
 
 class MeasureMonitor():
     class MonitorParameter():
@@ -76,7 +233,12 @@ class MeasureMonitor():
 
         def add_plot(self, key=None, color=None, line=False, marker='o',
                      maxlen=None, reset_on_update=False,
-                     value_fmt=None):
+                     value_fmt=None, display_points=None):
+            # display_points: number of drawn points (int), 'auto' for
+            # the width of the axes in pixels, or None to draw all points
+            if not (display_points is None or display_points == 'auto' or
+                    isinstance(display_points, int)):
+                raise ValueError('display_points should be None, int or auto')
             if value_fmt is None:
                 text_pos = None
             else:
@@ -92,8 +254,13 @@ class MeasureMonitor():
                 'reset_on_update': reset_on_update,
                 'text_pos': text_pos,
                 'value_fmt': value_fmt,
+                'display_points': display_points,
             })
 
+        @property
+        def keys(self):
+            return [params['key'] for params in self._plot_params]
+
         def create_plotter(self, ax):
             return [_PlotManager(ax, **params) for params in self._plot_params]
 
@@ -107,7 +274,7 @@ class MeasureMonitor():
                 data.append(vs * mul)
             return tuple(data)
 
-    def __init__(self, *parameters):
+    def __init__(self, *parameters, max_fps=10.0, blit=True):
         self._params = list()
         for param in parameters:
             if isinstance(param, self.MonitorParameter):
@@ -127,13 +294,97 @@ class MeasureMonitor():
             self._plotters.append(param.create_plotter(self.axes[i]))
             if len(self._plotters[-1]) > 1:
                 self.axes[i].legend(loc='lower left')
-        plt.pause(1.0)
+
+        # Only changed artists are redrawn on the cached background
+        canvas = self.fig.canvas
+        self._blit = blit and getattr(canvas, 'supports_blit', False)
+        self._background = None
+        if self._blit:
+            for artist in self._artists():
+                artist.set_animated(True)
+            canvas.mpl_connect('draw_event', self._on_draw)
+        self._min_interval = 0.0 if max_fps is None else 1.0 / max_fps
+        self._last_render = -float('inf')
+        # Data not drawn yet because of the frame rate cap
+        self._dirty = False
+
+        plt.show(block=False)
+        canvas.draw()
+        canvas.flush_events()
+
+    def _artists(self):
+        return [artist for plotters in self._plotters
+                for plotter in plotters for artist in plotter.artists]
+
+    def _on_draw(self, event):
+        # Full redraw (limits changed or window resized) renews the background
+        if not self._blit:
+            return
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for ax, plotters in zip(self.axes, self._plotters):
+            for plotter in plotters:
+                for artist in plotter.artists:
+                    ax.draw_artist(artist)
 
     def _fold_lims(self, lims):
         return reduce(lambda acm, lim: (min(acm[0], lim[0]),
                                         max(acm[1], lim[1])),
                       lims, (float('inf'), -float('inf')))
 
+    def _expand_lim(self, lim, vmin, vmax, margin):
+        # Returns new limits when data is out of (or much smaller than) lim
+        lo, hi = lim
+        if lo <= vmin and vmax <= hi and \
+           (vmax == vmin or (vmax - vmin) * 4 >= hi - lo):
+            # Constant data inside lim cannot be fitted better
+            return None
+        d = 1 if vmax == vmin else (vmax - vmin) * margin
+        return (vmin - d, vmax + d)
+
+    def _update_lims(self, i):
+        plotters = [p for p in self._plotters[i] if len(p) > 0]
+        if len(plotters) == 0:
+            return False
+        xmin, xmax = self._fold_lims([p.xlim for p in plotters])
+        ymin, ymax = self._fold_lims([p.ylim for p in plotters])
+
+        ax = self.axes[i]
+        xlim = self._expand_lim(ax.get_xlim(), xmin, xmax, 0.1)
+        ylim = self._expand_lim(ax.get_ylim(), ymin, ymax, 0.2)
+        if xlim is not None:
+            ax.set_xlim(xlim)
+        if ylim is not None:
+            ax.set_ylim(ylim)
+        return xlim is not None or ylim is not None
+
+    def _render(self):
+        now = time.time()
+        if now - self._last_render < self._min_interval:
+            self._dirty = True
+            return
+        self._last_render = now
+        self._dirty = False
+        for plotters in self._plotters:
+            for plotter in plotters:
+                plotter.sync()
+
+        canvas = self.fig.canvas
+        changed = [self._update_lims(i) for i in range(len(self.axes))]
+        if not self._blit:
+            canvas.draw_idle()
+        elif any(changed) or self._background is None:
+            # Background is renewed by _on_draw
+            canvas.draw()
+            canvas.blit(self.fig.bbox)
+        else:
+            canvas.restore_region(self._background)
+            self._draw_artists()
+            canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+
     def update(self, *args):
         assert len(args) == len(self._params)
 
@@ -146,14 +397,145 @@ class MeasureMonitor():
                 if coords is not None:
                     plotter(*self._params[i].arange(*coords))
 
-            xmin, xmax = self._fold_lims([p.xlim for p in self._plotters[i]])
-            ymin, ymax = self._fold_lims([p.ylim for p in self._plotters[i]])
-            dx = 1 if xmax == xmin else (xmax - xmin) * 0.1
-            dy = 1 if ymax == ymin else (ymax - ymin) * 0.2
-            self.axes[i].set_xlim((xmin - dx, xmax + dx))
-            self.axes[i].set_ylim((ymin - dy, ymax + dy))
+        self._render()
 
-        plt.pause(0.1)
+    def update_batch(self, batch, xkey='time'):
+        if len(batch) > 0:
+            self.update(*_batch_update(self._params, batch, xkey))
+
+    def refresh(self):
+        # Draw the data skipped by the frame rate cap once it is allowed,
+        # otherwise only process the window events
+        if self._dirty:
+            self._render()
+        else:
+            self.fig.canvas.flush_events()
 
     def finalize(self):
+        # Draw the latest data by the ordinary (blocking) renderer
+        self._blit = False
+        for artist in self._artists():
+            artist.set_animated(False)
+        self._last_render = -float('inf')
+        self._render()
         plt.show()
+
+
+def _batch_update(params, batch, xkey):
+    # Columns of RecordBatch whose label matches the plot key
+    # -> update() arguments
+    xs = batch[xkey]
+    return [[(xs, batch[key]) if key in batch else None
+             for key in param.keys] for param in params]
+
+
+def _normalize_update(params, args):
+    # update() arguments -> [[(xs, ys) or None for each plot] for each view]
+    normalized = list()
+    for param, data in zip(params, args):
+        n_plots = len(param.keys)
+        if data is None:
+            normalized.append([None] * n_plots)
+            continue
+        if isinstance(data[0], (int, float)):
+            data = [data]
+        coords = [None if c is None else
+                  (np.atleast_1d(np.asarray(c[0], dtype=float)),
+                   np.atleast_1d(np.asarray(c[1], dtype=float)))
+                  for c in data]
+        normalized.append(coords + [None] * (n_plots - len(coords)))
+    return normalized
+
+
+def _run_monitor(params, kwargs, channel):
+    monitor = MeasureMonitor(*params, **kwargs)
+    while True:
+        try:
+            cmd, args = channel.get(timeout=0.05)
+        except queue.Empty:
+            # Keep the window responsive and draw the throttled data
+            monitor.refresh()
+            continue
+
+        if cmd == 'update':
+            monitor.update(*args)
+        elif cmd == 'finalize':
+            monitor.finalize()
+            return
+        else:
+            return
+
+
+class MonitorProcess():
+    # MeasureMonitor rendered by a child process. Updates never block the
+    # caller: while the channel is full they are merged and sent later.
+    MonitorParameter = MeasureMonitor.MonitorParameter
+
+    def __init__(self, *parameters, queue_size=8, **kwargs):
+        self._params = list()
+        for param in parameters:
+            if isinstance(param, self.MonitorParameter):
+                self._params.append(param)
+            else:
+                raise ValueError('parameters should be MonitorParameter')
+
+        self._pending = None
+        self.n_coalesced = 0
+        ctx = multiprocessing.get_context('spawn')
+        self._channel = ctx.Queue(queue_size)
+        self._process = ctx.Process(target=_run_monitor,
+                                    args=(self._params, kwargs, self._channel),
+                                    daemon=True)
+        self._process.start()
+
+    def _merge(self, pending, update):
+        merged = list()
+        for param, old_view, new_view in zip(self._params, pending, update):
+            view = list()
+            for plot, old, new in zip(param._plot_params, old_view, new_view):
+                if old is None or new is None or plot['reset_on_update']:
+                    view.append(new if new is not None else old)
+                else:
+                    view.append((np.concatenate([old[0], new[0]]),
+                                 np.concatenate([old[1], new[1]])))
+            merged.append(view)
+        return merged
+
+    def update(self, *args):
+        assert len(args) == len(self._params)
+        if not self._process.is_alive():
+            return
+
+        update = _normalize_update(self._params, args)
+        if self._pending is not None:
+            update = self._merge(self._pending, update)
+            self.n_coalesced += 1
+        try:
+            self._channel.put_nowait(('update', update))
+            self._pending = None
+        except queue.Full:
+            # The monitor lags; send with the next update
+            self._pending = update
+
+    def update_batch(self, batch, xkey='time'):
+        if len(batch) > 0:
+            self.update(*_batch_update(self._params, batch, xkey))
+
+    def finalize(self):
+        # Wait until the window is closed
+        if self._process.is_alive():
+            if self._pending is not None:
+                self._channel.put(('update', self._pending))
+                self._pending = None
+            self._channel.put(('finalize', None))
+            self._process.join()
+
+    def close(self):
+        if self._process.is_alive():
+            try:
+                self._channel.put(('close', None), timeout=1.0)
+            except queue.Full:
+                pass
+            self._process.join(timeout=5.0)
+            if self._process.is_alive():
+                self._process.terminate()
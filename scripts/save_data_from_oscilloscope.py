@@ -5,7 +5,9 @@ import time
 
 import numpy as np
 
-from common import write_csv
+from archive import WaveformArchive, check_output_format
+from catalog import Catalog, DEFAULT_CATALOG_PATH, run_parameters
+from common import write_csv, waveform_batch
 from device import Oscilloscope
 from gui import GPIBArgumentParser, DialogMode
 
@@ -23,6 +25,12 @@ def parse_arguments():
                         help='Path to output directory.')
     parser.add_argument('cumulative time', 1.0, type=float,
                         help='Osilloscope signal cumlative time. (s)')
+    parser.add_argument('output format', 'csv', help='csv or archive')
+    parser.add_argument('raw waveform', 0, type=int,
+                        help='1: store ADC codes with scale and offset')
+    parser.add_argument('catalog', os.path.abspath(DEFAULT_CATALOG_PATH),
+                        browse_mode=DialogMode.WRITE,
+                        help='SQLite catalog of the measurements.')
     parser.add_device('oscilloscope', Oscilloscope)
 
     args = parser.parse_args()
@@ -36,6 +44,9 @@ def main():
     os.makedirs(os.path.dirname(dst_file), exist_ok=True)
 
     wait_time = args.get('cumulative time')
+    output_format = args['output format']
+    check_output_format(output_format)
+    raw = bool(args['raw waveform'])
 
     osc = args['device']['oscilloscope']
 
@@ -45,20 +56,19 @@ def main():
 
     osc.stop()
 
-    data = osc.get_data()
+    batch = waveform_batch(osc.get_data(raw))
 
-    labels = list()
-    columns = list()
-    for label, v in data.items():
-        if v[0].shape[0] == 0:
-            continue
-        if 'time' not in labels:
-            labels.append('time')
-            columns.append(v[0])
-        labels.append(label)
-        columns.append(v[1])
+    if output_format == 'archive':
+        with WaveformArchive(dst_file) as archive:
+            archive(batch, dict(cumulative_time=wait_time))
+    else:
+        write_csv(dst_file, batch)
 
-    write_csv(dst_file, columns, labels)
+    with Catalog(args['catalog']) as catalog:
+        catalog.start_run('save_data_from_oscilloscope', run_parameters(args))
+        catalog.register(dst_file, kind='oscilloscope',
+                         channels=batch.labels,
+                         meta=dict(cumulative_time=wait_time))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+
+import numpy as np
+
+from common import RecordBatch
+
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+class StreamBuffer():
+    # Time sorted column buffer of one stream.
+    # Views returned by this buffer are valid until the next append.
+    def __init__(self, labels, capacity=1024, maxlen=None, max_age=None,
+                 dtype=np.float64):
+        self._labels = list(labels)
+        self._times = np.empty(capacity, dtype=np.float64)
+        self._columns = OrderedDict([(label, np.empty(capacity, dtype=dtype))
+                                     for label in self._labels])
+        self._start = 0
+        self._end = 0
+
+        # Retention
+        self.maxlen = maxlen
+        self.max_age = max_age
+
+    @property
+    def labels(self):
+        return self._labels
+
+    @property
+    def times(self):
+        return self._times[self._start:self._end]
+
+    def column(self, label):
+        return self._columns[label][self._start:self._end]
+
+    def __len__(self):
+        return self._end - self._start
+
+    def _reserve(self, n):
+        size = len(self)
+        capacity = self._times.shape[0]
+        if self._end + n <= capacity:
+            return
+
+        # Grow when more than a half is used, otherwise compact in place
+        if size + n > capacity // 2:
+            capacity = max(capacity * 2, size + n)
+
+        def move(arr):
+            new = arr if capacity == arr.shape[0] else \
+                np.empty(capacity, dtype=arr.dtype)
+            new[:size] = arr[self._start:self._end]
+            return new
+
+        self._times = move(self._times)
+        for label in self._labels:
+            self._columns[label] = move(self._columns[label])
+        self._start = 0
+        self._end = size
+
+    def extend(self, times, rows):
+        # rows: list of dict or {label: array}
+        times = np.asarray(times, dtype=np.float64)
+        n = times.shape[0]
+        if n == 0:
+            return
+        if isinstance(rows, (list, tuple)):
+            rows = {label: [row[label] for row in rows]
+                    for label in self._labels}
+
+        self._reserve(n)
+        last = self._times[self._end - 1] if len(self) > 0 else -np.inf
+        end = self._end + n
+        self._times[self._end:end] = times
+        for label in self._labels:
+            self._columns[label][self._end:end] = rows[label]
+
+        sorted_end = self._end
+        self._end = end
+        if times[0] < last or np.any(np.diff(times) < 0):
+            self._sort_tail(sorted_end, times.min())
+        self._apply_retention()
+
+    def append(self, t, row):
+        self.extend([t], [row])
+
+    def _sort_tail(self, sorted_end, t_min):
+        # Only the samples after t_min can be out of order
+        logger.debug('Out of order samples in the stream')
+        k = self._start + np.searchsorted(self._times[self._start:sorted_end],
+                                          t_min, side='right')
+        order = np.argsort(self._times[k:self._end], kind='stable')
+        self._times[k:self._end] = self._times[k:self._end][order]
+        for column in self._columns.values():
+            column[k:self._end] = column[k:self._end][order]
+
+    def _apply_retention(self):
+        if self.maxlen is not None and len(self) > self.maxlen:
+            self._start = self._end - self.maxlen
+        if self.max_age is not None and len(self) > 0:
+            t_min = self._times[self._end - 1] - self.max_age
+            self.discard_before(t_min)
+
+    def discard(self, n):
+        self._start = min(self._start + n, self._end)
+
+    def discard_before(self, t):
+        self.discard(int(np.searchsorted(self.times, t, side='left')))
+
+    def batch(self, start=0, stop=None, time_label='time'):
+        stop = len(self) if stop is None else stop
+        columns = OrderedDict([(time_label, self.times[start:stop])])
+        for label in self._labels:
+            columns[label] = self.column(label)[start:stop]
+        return RecordBatch(columns)
+
+    # Joins: t may be a scalar or an array of the other stream's times.
+    def asof(self, t):
+        # Index of the last sample at or before t (-1: none)
+        return np.searchsorted(self.times, t, side='right') - 1
+
+    def nearest(self, t, tolerance=None):
+        # Index of the nearest sample (-1: none within tolerance)
+        times = self.times
+        if times.shape[0] == 0:
+            return np.full(np.shape(t), -1, dtype=np.int64)
+        t = np.asarray(t, dtype=np.float64)
+        right = np.clip(np.searchsorted(times, t), 0, times.shape[0] - 1)
+        left = np.clip(right - 1, 0, times.shape[0] - 1)
+        idx = np.where(np.abs(times[left] - t) <= np.abs(times[right] - t),
+                       left, right)
+        if tolerance is not None:
+            idx = np.where(np.abs(times[idx] - t) <= tolerance, idx, -1)
+        return idx
+
+    def window(self, start, end):
+        # Index range of samples in (start, end]
+        times = self.times
+        return (np.searchsorted(times, start, side='right'),
+                np.searchsorted(times, end, side='right'))
+
+    def pop_until(self, t, time_label='time'):
+        # Samples at or before t, which are removed from the buffer
+        stop = int(np.searchsorted(self.times, t, side='right'))
+        batch = self.batch(0, stop, time_label)
+        self.discard(stop)
+        return batch
@@ -3,13 +3,19 @@
 import os
 import math
 import time
+import asyncio
+from enum import Enum
 import numpy as np
 
-from common import write_csv, CSVWriter
+from archive import WaveformArchive, check_output_format
+from catalog import Catalog, DEFAULT_CATALOG_PATH, run_parameters
+from common import AsyncWriter, CSVWriter, RecordBatch, waveform_batch, \
+                   column_format, waveform_comments
 from device import Oscilloscope, TempratureController, SignalGenerator,\
                    LockinAmplifier, FrequencyCounter
-from gui import GPIBArgumentParser, MeasureMonitor, DialogMode
-from timer import Timer
+from gui import GPIBArgumentParser, MonitorProcess, DialogMode
+from stream_join import StreamBuffer
+from timer import Timer, Overflow
 
 from logging import getLogger, INFO, StreamHandler, NullHandler
 root_logger = getLogger()
@@ -19,6 +25,19 @@ logger = getLogger(__name__)
 logger.addHandler(NullHandler())
 
 
+# The number of temperature samples kept for the next oscilloscope record
+TEMPERATURE_RETENTION = 65536
+
+
+class MonitorMode(Enum):
+    # Write every monitor waveform with its temperature file
+    FULL = 'full'
+    # Write every N-th monitor waveform (temperature is in monitor.dat)
+    DECIMATE = 'decimate'
+    # Write waveform statistics only, referring to evaluation records
+    SUMMARY = 'summary'
+
+
 def parse_arguments():
     parser = GPIBArgumentParser('Temperature controlled oscilloscope monitor')
     parser.add_argument('output directory', './data/test',
@@ -29,6 +48,16 @@ def parse_arguments():
     parser.add_argument('oscilloscope relaxation time', 10.0, type=float)
     parser.add_argument('temperature measurements frequency', 10, type=int)
     parser.add_argument('temperature relaxation time', 120, type=float)
+    parser.add_argument('output format', 'csv', help='csv or archive')
+    parser.add_argument('raw waveform', 0, type=int,
+                        help='1: store ADC codes with scale and offset')
+    parser.add_argument('monitor mode', 'full',
+                        help='full, decimate or summary')
+    parser.add_argument('monitor decimation', 10, type=int,
+                        help='Monitor waveforms written in decimate mode: 1/N')
+    parser.add_argument('catalog', os.path.abspath(DEFAULT_CATALOG_PATH),
+                        browse_mode=DialogMode.WRITE,
+                        help='SQLite catalog of the measurements.')
     parser.add_device('oscilloscope', Oscilloscope)
     parser.add_device('temperature controller', TempratureController)
     parser.add_device('signal generator', SignalGenerator)
@@ -44,98 +73,208 @@ def load_setpt(setpt_file):
     return [float(line) for line in lines]
 
 
+async def _read_temperature_devices(temp, lockin, counter):
+    # Devices on different buses are read concurrently
+    return await asyncio.gather(counter.async_get(),
+                                lockin.async_get_amplitude(),
+                                temp.async_get_temprature())
+
+
 def get_temperature_data(temp, lockin, counter):
-    f = counter.get()
-    r, theta = lockin.get_amplitude()
+    f, (r, theta), Ts = asyncio.run(
+        _read_temperature_devices(temp, lockin, counter))
     x = math.cos(math.radians(theta)) * r
     y = math.sin(math.radians(theta)) * r
-    T = temp.get_temprature()[0]
+    T = Ts[0]
     return dict(T=T, f=f, X=x, Y=y, R=r, theta=theta)
 
 
-def get_oscilloscope_data(osc):
+def get_oscilloscope_data(osc, raw=False):
     osc.stop()
-    data = osc.get_data()
+    data = osc.get_data(raw)
     osc.start()
 
-    labels = list()
-    columns = list()
-    for label, v in data.items():
-        if v[0].shape[0] == 0:
-            continue
-        if 'time' not in labels:
-            labels.append('time')
-            columns.append(v[0])
-        labels.append(label)
-        columns.append(v[1])
-
-    return [{k: v[i] for k, v in zip(labels, columns)}
-            for i in range(len(columns[0]))]
+    return waveform_batch(data)
 
 
 class ConbinationDataWriter():
-    def __init__(self, outdir, osc_params, temp_params):
+    def __init__(self, outdir, osc_params, temp_params, output_format='csv',
+                 catalog=None, kind=None, write_temperature=True,
+                 decimation=1):
+        check_output_format(output_format)
+        if decimation < 1:
+            logger.error('Invalid decimation: %d', decimation)
+            raise ValueError('Invalid decimation: %d' % decimation)
+        self._catalog = catalog
+        self._kind = kind
+        self._write_temperature = write_temperature
+        self._decimation = decimation
         self._temp_dir = os.path.join(outdir, 'temperature')
         self._osc_dir = os.path.join(outdir, 'oscilloscope')
         self._osc_params = osc_params
         self._temp_params = temp_params
-        self._buffer = list()
+        # Temperature samples waiting for the next oscilloscope record
+        self._buffer = StreamBuffer([p.label for p in temp_params
+                                     if p.label != 'time'],
+                                    maxlen=TEMPERATURE_RETENTION)
         self._cnt = 0
+        self._n_received = 0
 
-        os.makedirs(self._temp_dir, exist_ok=True)
         os.makedirs(self._osc_dir, exist_ok=True)
-
-    def _create_writer(self):
+        if write_temperature:
+            os.makedirs(self._temp_dir, exist_ok=True)
+
+        # All acquisitions are appended to one archive file
+        self._osc_archive = None
+        self._temp_archive = None
+        if output_format == 'archive':
+            self._osc_archive = WaveformArchive(
+                os.path.join(self._osc_dir, 'oscilloscope.wfa'))
+            if write_temperature:
+                self._temp_archive = WaveformArchive(
+                    os.path.join(self._temp_dir, 'temperature.wfa'))
+
+    def _write_csv(self, data, temp_batch, meta):
         filename = '%06d.dat' % self._cnt
-        temp_writer = CSVWriter(os.path.join(self._temp_dir, filename),
-                                self._temp_params)
+        comments = ['%s: %s' % item for item in meta.items()]
+        comments.extend(waveform_comments(data.meta))
         osc_writer = CSVWriter(os.path.join(self._osc_dir, filename),
-                               self._osc_params)
-        return (osc_writer, temp_writer)
-
-    def __call__(self, osc_data, temp_data):
-        self._buffer.extend(temp_data)
-
-        for data, tosc in osc_data:
-            tbuf = np.asarray([row[1] for row in self._buffer])
-            idx = np.where(tbuf <= tosc)[0]
-
-            osc_writer, temp_writer = self._create_writer()
+                               self._osc_params, comments=comments)
+        with osc_writer:
             osc_writer(data)
-            temp_writer([dict(time=tbuf[i], **self._buffer[i][0]) for i in idx])
+        if self._write_temperature:
+            with CSVWriter(os.path.join(self._temp_dir, filename),
+                           self._temp_params) as temp_writer:
+                temp_writer(temp_batch)
+        return osc_writer.filename
+
+    def _write_archive(self, data, tosc, temp_batch, meta):
+        osc_archive, temp_archive = self._osc_archive, self._temp_archive
+        meta = dict(meta, acquisition=self._cnt, time=tosc)
+        if temp_archive is not None:
+            temp_archive(temp_batch, meta)
+        if len(temp_batch) > 0:
+            meta.update(T=temp_batch['T'][-1], f=temp_batch['f'][-1])
+        osc_archive(data, meta)
+        return osc_archive.filename
+
+    def _register(self, path, data, tosc, temp_batch, meta):
+        has_temp = len(temp_batch) > 0
+        self._catalog.register(
+            path, kind=self._kind, record=self._cnt,
+            timestamp=meta.get('start_time', float('nan')) + tosc,
+            setpoint=meta.get('setpoint'),
+            temperature=np.mean(temp_batch['T']) if has_temp else None,
+            frequency=np.mean(temp_batch['f']) if has_temp else None,
+            channels=data.labels, meta=dict(meta, time=tosc))
+
+    def __call__(self, osc_data, temp_data, meta=None):
+        meta = dict() if meta is None else meta
+
+        self._buffer.extend([t for _, t in temp_data],
+                            [row for row, _ in temp_data])
 
-            if len(self._buffer) > idx[-1] + 1:
-                self._buffer = self._buffer[idx[-1] + 1:]
+        for data, tosc in osc_data:
+            # Temperature samples since the previous record (may be empty)
+            temp_batch = self._buffer.pop_until(tosc)
+            self._n_received += 1
+            if (self._n_received - 1) % self._decimation != 0:
+                continue
+
+            if self._osc_archive is None:
+                path = self._write_csv(data, temp_batch, meta)
             else:
-                self._buffer = []
+                path = self._write_archive(data, tosc, temp_batch, meta)
+            if self._catalog is not None:
+                self._register(path, data, tosc, temp_batch, meta)
             self._cnt += 1
 
+    def close(self):
+        for archive in (self._osc_archive, self._temp_archive):
+            if archive is not None:
+                archive.close()
+
+
+class WaveformSummaryWriter():
+    STATISTICS = (('mean', np.mean), ('std', np.std),
+                  ('min', np.min), ('max', np.max))
+
+    def __init__(self, filename, osc_keys):
+        self._keys = [key for key in osc_keys if key != 'time']
+        params = [
+            CSVWriter.OutputParameter('time', fmt='%.3f', unit='s'),
+            CSVWriter.OutputParameter('source', fmt='%s'),
+            CSVWriter.OutputParameter('record', fmt='%d'),
+        ]
+        params.extend([CSVWriter.OutputParameter('%s %s' % (key, name),
+                                                 fmt='%.6e', unit='V')
+                       for key in self._keys for name, _ in self.STATISTICS])
+        self._writer = CSVWriter(filename, params)
+
+    def __call__(self, osc_data, source, record=-1):
+        # record: the first evaluation record number (-1: not written)
+        rows = list()
+        for i, (data, tosc) in enumerate(osc_data):
+            row = dict(time=tosc, source=source,
+                       record=-1 if record < 0 else record + i)
+            for key in self._keys:
+                vs = data.physical(key) if key in data else np.zeros(0)
+                for name, fn in self.STATISTICS:
+                    row['%s %s' % (key, name)] = \
+                        fn(vs) if vs.shape[0] > 0 else float('nan')
+            rows.append(row)
+        self._writer(rows)
+
+    def close(self):
+        self._writer.close()
+
 
 def setup_monitor():
-    temp_view = MeasureMonitor('time / s', 'Temperature / K')
+    temp_view = MonitorProcess.MonitorParameter('time / s', 'Temperature / K')
     temp_view.add_plot(key='T', value_fmt='%.3f K')
-    freq_view = MeasureMonitor('time / s', 'Frequency / Hz')
+    freq_view = MonitorProcess.MonitorParameter('time / s', 'Frequency / Hz')
     freq_view.add_plot(key='f', value_fmt='%.5f Hz')
-    amp_view = MeasureMonitor('time / s', 'Amplitude / mV', ymul=1.0e3)
+    amp_view = MonitorProcess.MonitorParameter('time / s', 'Amplitude / mV',
+                                               ymul=1.0e3)
     amp_view.add_plot(key='R', value_fmt='%.3e mV')
-    phase_view = MeasureMonitor('time / s', 'Phase / deg')
+    phase_view = MonitorProcess.MonitorParameter('time / s', 'Phase / deg')
     phase_view.add_plot(key='theta', value_fmt='%.2f')
-    return MeasureMonitor(temp_view, freq_view, amp_view, phase_view)
+    return MonitorProcess(temp_view, freq_view, amp_view, phase_view)
 
 
 class MeasurementUpdater():
-    def __init__(self, outdir, osc_timer, temp_timer, osc_params, temp_params):
+    def __init__(self, outdir, osc_timer, temp_timer, osc_params, temp_params,
+                 output_format='csv', catalog=None,
+                 monitor_mode=MonitorMode.FULL, decimation=10):
         # Timers
         self._osc_timer = osc_timer
         self._temp_timer = temp_timer
 
-        # Data writers
-        self.evaluator = ConbinationDataWriter(outdir, osc_params, temp_params)
+        # Data writers (files are written on background threads)
+        self.evaluator = AsyncWriter(ConbinationDataWriter(
+            outdir, osc_params, temp_params, output_format,
+            catalog, 'evaluation'))
         monitor_dir = os.path.join(outdir, 'monitor')
-        self.monitor = ConbinationDataWriter(monitor_dir,
-                                             osc_params, temp_params)
-        self.logger = CSVWriter(os.path.join(monitor_dir, 'monitor.dat'),
-                                temp_params)
+        self.monitor = None
+        self.summary = None
+        if monitor_mode is MonitorMode.SUMMARY:
+            # Full waveforms are written only by the evaluator
+            os.makedirs(monitor_dir, exist_ok=True)
+            self.summary = AsyncWriter(WaveformSummaryWriter(
+                os.path.join(monitor_dir, 'summary.dat'),
+                [p.label for p in osc_params]))
+        elif monitor_mode is MonitorMode.DECIMATE:
+            self.monitor = AsyncWriter(ConbinationDataWriter(
+                monitor_dir, osc_params, temp_params, output_format,
+                catalog, 'monitor', write_temperature=False,
+                decimation=decimation))
+        else:
+            self.monitor = AsyncWriter(ConbinationDataWriter(
+                monitor_dir, osc_params, temp_params, output_format,
+                catalog, 'monitor'))
+        self.logger = AsyncWriter(
+            CSVWriter(os.path.join(monitor_dir, 'monitor.dat'), temp_params))
+        self._temp_labels = [p.label for p in temp_params]
 
         # GUI
         self.viewer = setup_monitor()
@@ -143,6 +282,8 @@ class MeasurementUpdater():
         self._eval = False
         self._ready = False
         self._t0 = float('nan')
+        self._meta = dict()
+        self._n_eval = 0
 
     def eval(self):
         self._eval = True
@@ -154,10 +295,25 @@ class MeasurementUpdater():
     def is_eval(self):
         return self._eval
 
+    def set_setpoint(self, setpoint):
+        # Recorded with every acquisition
+        self._meta = dict(self._meta, setpoint=setpoint)
+
     def start(self):
         self._osc_timer.start()
         self._temp_timer.start()
         self._t0 = time.time()
+        self._meta = dict(self._meta, start_time=self._t0)
+
+    def close(self):
+        self._osc_timer.stop()
+        self._temp_timer.stop()
+        # Wait for pending data to be written
+        for writer in (self.evaluator, self.monitor, self.summary,
+                       self.logger):
+            if writer is not None:
+                writer.close()
+        self.viewer.close()
 
     def __call__(self):
         assert not math.isnan(self._t0), 'Cannot call updater before start()'
@@ -168,24 +324,28 @@ class MeasurementUpdater():
                      for data, t in self._temp_timer.fetch()]
 
         # Update logger
-        data = [dict(time=t, **kwargs) for (kwargs, t) in temp_data]
-        self.logger(data)
+        batch = RecordBatch.from_rows([dict(time=t, **kwargs)
+                                       for (kwargs, t) in temp_data],
+                                      self._temp_labels)
+        self.logger(batch)
 
         # Update viewer
-        t = [kwargs.get('t') for kwargs in data]
-        self.viewer.update((t, [kwargs.get('T') for kwargs in data]),
-                           (t, [kwargs.get('f') for kwargs in data]),
-                           (t, [kwargs.get('R') for kwargs in data]),
-                           (t, [kwargs.get('theta') for kwargs in data]))
+        self.viewer.update_batch(batch)
 
         if self._eval and self._ready:
-            self.evaluator(osc_data, temp_data)
+            self.evaluator(osc_data, temp_data, self._meta)
+            if self.summary is not None:
+                self.summary(osc_data, 'evaluation', self._n_eval)
+            self._n_eval += len(osc_data)
             if len(osc_data) > 0:
                 self.relax()
         else:
             if self._eval:
                 self._ready = len(osc_data) > 0
-            self.monitor(osc_data, temp_data)
+            if self.monitor is not None:
+                self.monitor(osc_data, temp_data, self._meta)
+            if self.summary is not None:
+                self.summary(osc_data, 'monitor')
 
 
 def main():
@@ -200,6 +360,10 @@ def main():
     lockin = args['device']['lockin amplifier']
     counter = args['device']['frequency counter']
 
+    # Configurations are changed only by this script
+    osc.enable_settings_cache()
+    temp.enable_settings_cache()
+
     # Monitor R & theta
     lockin.set_variable_type(lockin.VariableType.R)
     lockin.set_variable_type(lockin.VariableType.THETA)
@@ -212,13 +376,16 @@ def main():
     assert relax_time > temp_wait_time
 
     # Timer
-    osc_timer = Timer(get_oscilloscope_data, osc_wait_time, args=(osc,))
+    # Keep few waveforms in memory when the updater falls behind
+    raw = bool(args['raw waveform'])
+    osc_timer = Timer(get_oscilloscope_data, osc_wait_time, args=(osc, raw),
+                      maxlen=2, overflow=Overflow.SKIP)
     temp_timer = Timer(get_temperature_data, temp_wait_time,
                        args=(temp, lockin, counter))
 
     # Get valid oscilloscope data labels
-    osc_data = get_oscilloscope_data(osc)
-    osc_keys = osc_data[0].keys()
+    osc_data = get_oscilloscope_data(osc, raw)
+    osc_keys = osc_data.labels
     osc.stop()
 
     # Output data labels
@@ -231,38 +398,53 @@ def main():
         CSVWriter.OutputParameter('R', fmt='%.3e', unit='V'),
         CSVWriter.OutputParameter('theta', fmt='%.2f', unit='degree'),
     ]
-    osc_parameters = [CSVWriter.OutputParameter(lbl, fmt='%.6e')
-                      for lbl in osc_keys]
+    # Raw codes are written as integers
+    osc_parameters = [
+        CSVWriter.OutputParameter(lbl,
+                                  fmt=column_format(osc_data, lbl, '%.6e'))
+        for lbl in osc_keys
+    ]
 
     # Create updater
     outdir = args['output directory']
+    catalog = Catalog(args['catalog'])
+    catalog.start_run('temperature_control_oscilloscope_monitor',
+                      run_parameters(args))
     updater = MeasurementUpdater(outdir, osc_timer, temp_timer,
-                                 osc_parameters, temp_parameters)
+                                 osc_parameters, temp_parameters,
+                                 args['output format'], catalog,
+                                 MonitorMode(args['monitor mode']),
+                                 args['monitor decimation'])
 
     # Measurement loop
-    sig.start()
-    osc.start()
-    updater.start()
-    for T_next in setpts:
-        temp.set_temprature(T_next)
-        temp.start_control()
-        T = temp.get_temprature()[0]
-        logger.info('Set point: %.3f K (current: %.3f K)', T_next, T)
-
-        # Relaxation
-        t = time.time()
-        updater.relax()
-        while time.time() - t < relax_time:
-            updater()
-            time.sleep(update_time)
-
-        # Evaluation
-        logger.info('Start evaluation measurement')
-        updater.eval()
-        while updater.is_eval():
-            updater()
-            time.sleep(update_time)
-
+    try:
+        sig.start()
+        osc.start()
+        updater.start()
+        for T_next in setpts:
+            temp.set_temprature(T_next)
+            temp.start_control()
+            updater.set_setpoint(T_next)
+            T = temp.get_temprature()[0]
+            logger.info('Set point: %.3f K (current: %.3f K)', T_next, T)
+
+            # Relaxation
+            t = time.time()
+            updater.relax()
+            while time.time() - t < relax_time:
+                updater()
+                time.sleep(update_time)
+
+            # Evaluation
+            logger.info('Start evaluation measurement')
+            updater.eval()
+            while updater.is_eval():
+                updater()
+                time.sleep(update_time)
+    finally:
+        # Write the queued data also on errors and Ctrl-C
+        updater.close()
+        catalog.close()
     sig.stop()
     osc.stop()
 
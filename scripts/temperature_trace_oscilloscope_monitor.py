@@ -5,7 +5,9 @@ import time
 
 import numpy as np
 
-from common import write_csv
+from archive import WaveformArchive, check_output_format
+from catalog import Catalog, DEFAULT_CATALOG_PATH, run_parameters
+from common import AsyncWriter, write_csv, waveform_batch
 from device import Oscilloscope, Multimeter
 from gui import GPIBArgumentParser, DialogMode
 
@@ -26,6 +28,12 @@ def parse_arguments():
                         5, type=int)
     parser.add_argument('monitor interval', 0.0, type=float)
     parser.add_argument('max monitor points', 100, type=int)
+    parser.add_argument('output format', 'csv', help='csv or archive')
+    parser.add_argument('raw waveform', 0, type=int,
+                        help='1: store ADC codes with scale and offset')
+    parser.add_argument('catalog', os.path.abspath(DEFAULT_CATALOG_PATH),
+                        browse_mode=DialogMode.WRITE,
+                        help='SQLite catalog of the measurements.')
     parser.add_device('oscilloscope', Oscilloscope)
     parser.add_device('mulimeter', Multimeter)
 
@@ -60,42 +68,59 @@ def main():
         'oscilloscope cumlative time: %.3e s' % args['oscilloscope cumlative time'],
     ]
 
-    for i in range(args['max monitor points']):
-        osc.start()
-
-        temperatures = list()
-        for _ in range(n_measure):
+    output_format = args['output format']
+    check_output_format(output_format)
+    raw = bool(args['raw waveform'])
+    archive_path = os.path.join(outdir, 'oscilloscope.wfa')
+    if output_format == 'archive':
+        writer = WaveformArchive(archive_path)
+    else:
+        writer = write_csv
+
+    catalog = Catalog(args['catalog'])
+    catalog.start_run('temperature_trace_oscilloscope_monitor',
+                      run_parameters(args))
+
+    # Files are written on a background thread
+    with AsyncWriter(writer) as writer, catalog:
+        for i in range(args['max monitor points']):
+            osc.start()
+
+            temperatures = list()
+            for _ in range(n_measure):
+                temperatures.append(ruo2_thermometer(meter.get_voltage()))
+                time.sleep(wait_time)
             temperatures.append(ruo2_thermometer(meter.get_voltage()))
-            time.sleep(wait_time)
-        temperatures.append(ruo2_thermometer(meter.get_voltage()))
-
-        osc.stop()
-        data = osc.get_data()
-
-        labels = list()
-        columns = list()
-        for label, v in data.items():
-            if v[0].shape[0] == 0:
-                continue
-            if 'time' not in labels:
-                labels.append('time')
-                columns.append(v[0])
-            labels.append(label)
-            columns.append(v[1])
-
-        temperatures = np.asarray(temperatures)
-        avg_temp = np.average(temperatures)
-        var_temp = np.sqrt(np.average(temperatures ** 2) - avg_temp ** 2)
-        comments = [
-            *meta,
-            'temperature: %.5e +/- %.3e K' % (avg_temp, var_temp),
-        ]
-
-        filename = '%03d_%.2e_oscilloscope.dat' % (i, np.average(temperatures))
-        write_csv(os.path.join(outdir, filename), columns, labels, comments)
-        logger.info('Data is saved to "%s".', filename)
-
-        time.sleep(interval)
+
+            osc.stop()
+            batch = waveform_batch(osc.get_data(raw))
+
+            temperatures = np.asarray(temperatures)
+            avg_temp = np.average(temperatures)
+            var_temp = np.sqrt(np.average(temperatures ** 2) - avg_temp ** 2)
+
+            record_meta = dict(
+                acquisition=i, temperature=avg_temp,
+                temperature_error=var_temp,
+                cumulative_time=args['oscilloscope cumlative time'])
+            if output_format == 'archive':
+                path = archive_path
+                writer(batch, record_meta)
+                logger.info('Data %d is queued to the archive.', i)
+            else:
+                comments = [
+                    *meta,
+                    'temperature: %.5e +/- %.3e K' % (avg_temp, var_temp),
+                ]
+                filename = '%03d_%.2e_oscilloscope.dat' % (i, avg_temp)
+                path = os.path.join(outdir, filename)
+                writer(path, batch, comments=comments)
+                logger.info('Data is queued to "%s".', filename)
+            catalog.register(path, kind='temperature trace', record=i,
+                             temperature=avg_temp, channels=batch.labels,
+                             meta=record_meta)
+
+            time.sleep(interval)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import subprocess
+
+import numpy as np
+import pytest
+
+from archive import ArchiveReader, WaveformArchive, load_archive, \
+    parse_header
+from common import RecordBatch
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _batch(i, n=3):
+    # Odd lengths of small types need padding
+    return RecordBatch(dict(ch1=np.arange(n, dtype=np.int16) + i,
+                            ch2=np.linspace(0.0, 1.0, n) + i,
+                            flag=np.arange(n, dtype=np.uint8)),
+                       units=dict(ch1='code', ch2='V'),
+                       meta=dict(dt=dict(ch1=1.0e-3)))
+
+
+def test_round_trip(tmp_path):
+    filename = str(tmp_path / 'osc.wfa')
+    with WaveformArchive(filename, 'w') as archive:
+        for i in range(3):
+            archive(_batch(i, 3 + i), dict(acquisition=i, time=0.5 * i))
+
+    records = load_archive(filename)
+    assert len(records) == 3
+    for i, record in enumerate(records):
+        expected = _batch(i, 3 + i)
+        assert record.labels == expected.labels
+        for label in expected.labels:
+            assert record[label].dtype == expected[label].dtype
+            assert np.array_equal(record[label], expected[label])
+        assert record.units == dict(ch1='code', ch2='V', flag='')
+        assert record.meta == dict(dt=dict(ch1=1.0e-3), acquisition=i,
+                                   time=0.5 * i)
+
+
+def test_alignment(tmp_path):
+    filename = str(tmp_path / 'osc.wfa')
+    with WaveformArchive(filename, 'w') as archive:
+        for i in range(3):
+            archive(_batch(i, 3 + i))
+
+    buf = open(filename, 'rb').read()
+    pos = 0
+    while pos < len(buf):
+        assert pos % 8 == 0
+        header, data_pos = parse_header(buf, pos)
+        assert data_pos % 8 == 0
+        for column in header['columns']:
+            assert column['offset'] % 8 == 0
+        assert header['size'] % 8 == 0
+        pos = data_pos + header['size']
+    assert pos == len(buf)
+
+
+def test_append_mode(tmp_path):
+    filename = str(tmp_path / 'osc.wfa')
+    for i in range(2):
+        with WaveformArchive(filename) as archive:
+            archive(_batch(i))
+    assert len(load_archive(filename)) == 2
+
+
+def test_truncated_record(tmp_path):
+    filename = tmp_path / 'osc.wfa'
+    with WaveformArchive(str(filename), 'w') as archive:
+        for i in range(2):
+            archive(_batch(i))
+
+    # Records before a partly written one are read
+    data = filename.read_bytes()
+    for size in (len(data) - 1, len(data) - 20, len(data) // 2 + 10):
+        filename.write_bytes(data[:size])
+        assert len(load_archive(str(filename))) == 1
+
+
+def test_reader_without_drivers():
+    # Archives are read on machines without VISA
+    code = ('import sys, archive; '
+            'print(sorted({"pyvisa", "device"} & set(sys.modules)))')
+    res = subprocess.run([sys.executable, '-c', code], cwd=SCRIPTS_DIR,
+                         stdout=subprocess.PIPE, check=True)
+    assert res.stdout.decode().strip() == '[]'
+
+
+def _write_records(filename):
+    # Acquisitions are not in time order
+    metas = [dict(acquisition=2, time=2.0, setpoint=4.0),
+             dict(acquisition=0, time=0.0, setpoint=4.0),
+             dict(acquisition=1, time=1.0, setpoint=5.0),
+             dict(acquisition=3, time=3.0, setpoint=5.0 + 1.0e-9)]
+    with WaveformArchive(filename, 'w') as archive:
+        for meta in metas:
+            archive(_batch(meta['acquisition']), meta)
+
+
+def test_reader_index(tmp_path):
+    filename = str(tmp_path / 'osc.wfa')
+    _write_records(filename)
+    with ArchiveReader(filename) as reader:
+        assert len(reader) == 4
+        assert [reader.find_acquisition(i) for i in range(4)] == \
+            [1, 2, 0, 3]
+        with pytest.raises(KeyError):
+            reader.find_acquisition(4)
+
+        # The last record at or before t
+        assert reader.find_time(1.0) == 2
+        assert reader.find_time(1.5) == 2
+        assert reader.find_time(10.0) == 3
+        with pytest.raises(KeyError):
+            reader.find_time(-0.5)
+
+        # [start, end)
+        assert list(reader.select_time(1.0, 3.0)) == [0, 2]
+        assert list(reader.select_time(5.0, 6.0)) == []
+        assert list(reader.select_setpoint(4.0)) == [0, 1]
+        assert list(reader.select_setpoint(5.0)) == [2, 3]
+        assert list(reader.select_setpoint(5.0, tolerance=0.0)) == [2]
+
+
+def test_reader_columns(tmp_path):
+    filename = str(tmp_path / 'osc.wfa')
+    _write_records(filename)
+    with ArchiveReader(filename) as reader:
+        record = reader[0]
+        expected = _batch(2)
+        for label in expected.labels:
+            assert np.array_equal(record[label], expected[label])
+        assert record.meta['acquisition'] == 2
+        assert reader.meta(1)['acquisition'] == 0
+
+        channel = reader.channel('ch1', [1, 2])
+        assert [list(c) for c in channel] == [[0, 1, 2], [1, 2, 3]]
+        assert len(reader.channel('ch2')) == 4
+        with pytest.raises(KeyError):
+            reader.column(0, 'ch3')
+        assert [r.meta['acquisition'] for r in reader] == [2, 0, 1, 3]
+
+
+def test_reader_truncated(tmp_path):
+    filename = tmp_path / 'osc.wfa'
+    _write_records(str(filename))
+    data = filename.read_bytes()
+    filename.write_bytes(data[:-5])
+    with ArchiveReader(str(filename)) as reader:
+        assert len(reader) == 3
+        assert reader.find_acquisition(1) == 2
+
+    filename.write_bytes(b'')
+    with ArchiveReader(str(filename)) as reader:
+        assert len(reader) == 0
+
+
+@pytest.mark.parametrize('corrupt', ['magic', 'header'])
+def test_reader_corrupt(tmp_path, monkeypatch, corrupt):
+    filename = tmp_path / 'osc.wfa'
+    _write_records(str(filename))
+    data = bytearray(filename.read_bytes())
+    if corrupt == 'magic':
+        data[0:4] = b'XXXX'
+    else:
+        data[8] = ord('#')
+    filename.write_bytes(bytes(data))
+
+    maps = list()
+    close = ArchiveReader.close
+
+    def record_close(reader):
+        maps.append(reader._mmap)
+        close(reader)
+    monkeypatch.setattr(ArchiveReader, 'close', record_close)
+    with pytest.raises(ValueError):
+        ArchiveReader(str(filename))
+    # The map is closed before the error is raised
+    assert len(maps) == 1 and maps[0].closed
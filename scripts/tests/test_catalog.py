@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+import pathlib
+
+import numpy as np
+
+from archive import WaveformArchive, load_archive
+from catalog import Catalog
+from common import RecordBatch
+
+
+def test_metadata_agrees_with_archive(tmp_path):
+    meta = dict(setpoint=np.float32(4.5), gain=np.arange(3),
+                source=pathlib.Path('data'))
+    filename = str(tmp_path / 'osc.wfa')
+    with WaveformArchive(filename) as archive:
+        archive(RecordBatch(dict(ch1=np.zeros(4))), meta)
+    with Catalog(str(tmp_path / 'catalog.sqlite')) as catalog:
+        catalog.register(filename, meta=meta)
+        row, = catalog.query()
+
+    record, = load_archive(filename)
+    assert row['meta'] == record.meta
+    assert row['meta'] == dict(setpoint=4.5, gain=[0, 1, 2], source='data')
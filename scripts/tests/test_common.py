@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import subprocess
+
+import numpy as np
+import pytest
+
+from common import CSVWriter, RecordBatch, CSV_CHUNK_ROWS, format_rows, \
+    write_csv, waveform_batch
+from device.oscilloscope import Waveform
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_csv_writer_delimiter(tmp_path):
+    # Same output as the rows formerly written by cryo_monitor
+    labels = ('t', 'T', 'P')
+    row = (0.5, 4.2, 1.0e-3)
+    filename = tmp_path / 'cryo.dat'
+    with CSVWriter(str(filename), [CSVWriter.OutputParameter(lbl, fmt='%s')
+                                   for lbl in labels],
+                   delimiter=',') as writer:
+        writer(dict(zip(labels, row)))
+
+    expected = '# %s\n' % ', '.join(labels) + \
+               '%s\n' % ','.join([str(v) for v in row])
+    assert filename.read_text() == expected
+
+
+def test_async_writer_drains_on_error(tmp_path):
+    # Queued rows are written when the script exits by an exception
+    filename = tmp_path / 'out.dat'
+    code = '\n'.join([
+        'from common import AsyncWriter, CSVWriter',
+        'writer = AsyncWriter(CSVWriter(%r, CSVWriter.OutputParameter('
+        '"x", fmt="%%d")))' % str(filename),
+        'writer(dict(x=1))',
+        'raise RuntimeError',
+    ])
+    res = subprocess.run([sys.executable, '-c', code], cwd=SCRIPTS_DIR,
+                         stderr=subprocess.PIPE)
+    assert res.returncode != 0
+    assert filename.read_text() == '# x\n1\n'
+
+
+def _write_csv_rows(filename, columns, labels):
+    # Former write_csv, which formatted one value at a time
+    csv_text = '# %s\n' % '.'.join(labels)
+    for i in range(len(columns[0])):
+        for column in columns:
+            csv_text += '%.5e, ' % column[i]
+        csv_text += '\n'
+    with open(filename, 'wt') as f:
+        f.write(csv_text)
+
+
+def test_write_csv_compatible(tmp_path):
+    # Integer valued columns are written as before
+    columns = [np.linspace(0.0, 1.0, 11), np.arange(11),
+               np.arange(11, dtype=np.int16) * -3]
+    labels = ['time', 'index', 'ch1']
+    write_csv(str(tmp_path / 'new.csv'), columns, labels)
+    _write_csv_rows(str(tmp_path / 'old.csv'), columns, labels)
+    assert (tmp_path / 'new.csv').read_bytes() == \
+        (tmp_path / 'old.csv').read_bytes()
+
+    batch = RecordBatch(dict(zip(labels, columns)))
+    write_csv(str(tmp_path / 'batch.csv'), batch)
+    assert (tmp_path / 'batch.csv').read_bytes() == \
+        (tmp_path / 'old.csv').read_bytes()
+
+
+def test_write_csv_raw_codes(tmp_path):
+    codes = np.array([-2, 0, 3], dtype=np.int16)
+    batch = waveform_batch(dict(ch1=Waveform(codes, 1.0e-3, scale=0.5,
+                                             offset=0.25)))
+    filename = tmp_path / 'raw.csv'
+    write_csv(str(filename), batch)
+    rows = [line for line in filename.read_text().splitlines()
+            if not line.startswith('#')]
+    assert rows == ['-2, ', '0, ', '3, ']
+
+
+@pytest.mark.parametrize('n_rows', [0, 1, 9, 10, 11, 25])
+def test_format_rows_chunks(n_rows):
+    # Rows across the chunk boundaries are formatted as one at a time
+    columns = [np.arange(n_rows) * 0.5, np.arange(n_rows)]
+    row_fmt = '%.3f, %d\n'
+    chunks = list(format_rows(row_fmt, columns, chunk_rows=10))
+    assert len(chunks) == -(-n_rows // 10)
+    assert all(text.count('\n') <= 10 for text in chunks)
+    assert ''.join(chunks) == ''.join([row_fmt % (x, i) for x, i
+                                       in zip(*columns)])
+
+
+def test_write_csv_chunk_boundary(tmp_path):
+    n_rows = CSV_CHUNK_ROWS + 1
+    columns = [np.linspace(0.0, 1.0, n_rows)]
+    write_csv(str(tmp_path / 'new.csv'), columns, ['time'])
+    _write_csv_rows(str(tmp_path / 'old.csv'), columns, ['time'])
+    assert (tmp_path / 'new.csv').read_bytes() == \
+        (tmp_path / 'old.csv').read_bytes()
+
+
+def test_raw_code_units():
+    codes = np.array([-2, 0, 3], dtype=np.int16)
+    batch = waveform_batch(dict(ch1=Waveform(codes, 1.0e-3, scale=0.5,
+                                             offset=0.25),
+                                ch2=Waveform(np.ones(3), 1.0e-3)))
+    assert batch.units == dict(ch1='code', ch2='V')
+    assert batch.physical_unit('ch1') == 'V'
+    assert batch.physical_unit('ch2') == 'V'
+
+    physical = batch.to_physical()
+    assert physical.units == dict(ch1='V', ch2='V')
+    assert np.array_equal(physical['ch1'], [-0.75, 0.25, 1.75])
+    assert not physical.is_raw('ch1')
+    assert physical.meta['dt'] == batch.meta['dt']
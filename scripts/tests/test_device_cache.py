@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import pyvisa as visa
+
+from device.cache import IdentificationCache
+from device.provider import DeviceProvider, PING_TIMEOUT
+from device.registry import DriverRegistry
+from device.oscilloscope.yokogawa_dl9140l import Yokogawa_DL9140L
+
+IDN = 'YOKOGAWA,701311,0,1.0'
+
+
+def test_cache_round_trip(tmp_path):
+    path = str(tmp_path / 'devices.json')
+    cache = IdentificationCache(path)
+    cache.set('GPIB0::1::INSTR', IDN, Yokogawa_DL9140L)
+    cache.set('GPIB0::2::INSTR', 'UNKNOWN', None)
+    cache.save()
+
+    cache = IdentificationCache(path)
+    assert cache.get('GPIB0::1::INSTR') == (IDN, Yokogawa_DL9140L)
+    assert cache.get('GPIB0::2::INSTR') == ('UNKNOWN', None)
+    assert cache.get('GPIB0::3::INSTR') is None
+
+    cache.discard('GPIB0::2::INSTR')
+    cache.save()
+    assert IdentificationCache(path).get('GPIB0::2::INSTR') is None
+
+
+def test_cache_broken_file(tmp_path):
+    path = tmp_path / 'devices.json'
+    path.write_text('{broken')
+    assert IdentificationCache(str(path)).get('GPIB0::1::INSTR') is None
+
+
+def test_cache_unavailable_driver(tmp_path):
+    path = tmp_path / 'devices.json'
+    path.write_text('{"GPIB0::1::INSTR": '
+                    '{"idn": "X", "model": "device.missing:Driver"}}')
+    assert IdentificationCache(str(path)).get('GPIB0::1::INSTR') is None
+
+
+class _Resource():
+    def __init__(self, idn):
+        self.idn = idn
+        self.timeout = 2000
+        self.timeouts = list()
+
+    def query(self, cmd):
+        self.timeouts.append(self.timeout)
+        if self.idn is None:
+            raise visa.VisaIOError(visa.constants.StatusCode.error_timeout)
+        return self.idn + '\n'
+
+
+def _provider(cache, timeout=1000):
+    # Provider without a visa resource manager
+    provider = DeviceProvider.__new__(DeviceProvider)
+    provider._drivers = DriverRegistry()
+    provider._timeout = timeout
+    provider._cache = cache
+    return provider
+
+
+def test_silent_address_is_not_cached(tmp_path):
+    cache = IdentificationCache(str(tmp_path / 'devices.json'))
+    provider = _provider(cache)
+    resource = _Resource(None)
+    assert provider._probe('GPIB0::1::INSTR', resource) == ('', None)
+    assert cache.get('GPIB0::1::INSTR') is None
+
+    # Device powered on later is found by the normal probe
+    resource.idn = 'SLOW,DEVICE'
+    assert provider._probe('GPIB0::1::INSTR', resource) == \
+        ('SLOW,DEVICE', None)
+    assert cache.get('GPIB0::1::INSTR') == ('SLOW,DEVICE', None)
+
+
+def test_cached_silent_address_is_probed(tmp_path):
+    # Negative entry written by a former version
+    cache = IdentificationCache(str(tmp_path / 'devices.json'))
+    cache.set('GPIB0::1::INSTR', '', None)
+    provider = _provider(cache)
+    resource = _Resource(IDN)
+    assert provider._check_cache('GPIB0::1::INSTR', resource) is None
+    assert resource.timeouts == []
+
+
+def test_cached_device_is_pinged(tmp_path):
+    cache = IdentificationCache(str(tmp_path / 'devices.json'))
+    cache.set('GPIB0::1::INSTR', IDN, Yokogawa_DL9140L)
+    provider = _provider(cache)
+
+    resource = _Resource(IDN)
+    assert provider._check_cache('GPIB0::1::INSTR', resource) == \
+        (IDN, Yokogawa_DL9140L)
+    assert resource.timeouts == [PING_TIMEOUT]
+    assert resource.timeout == 2000
+
+    # Changed or slow devices are probed again
+    assert provider._check_cache('GPIB0::1::INSTR', _Resource('OTHER')) \
+        is None
+    assert provider._check_cache('GPIB0::1::INSTR', _Resource(None)) is None
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from device.lcr_meter.hp_4284a import HP_4284A
+
+
+class _Resource():
+    def __init__(self):
+        self.commands = list()
+
+    def write(self, cmd):
+        self.commands.append(cmd)
+
+    def query(self, cmd):
+        self.commands.append(cmd)
+        values = {':function:impedance:type?': 'CPD',
+                  ':fetch?': '+1.0E-12,+2.0E-03,+0'}
+        return ';'.join([values[c] for c in cmd.split(';')]) + '\n'
+
+
+def _lcr_meter():
+    # Handler without opening a visa resource
+    lcr = HP_4284A.__new__(HP_4284A)
+    lcr._inst = _Resource()
+    lcr._bus_lock = threading.RLock()
+    lcr._lock = threading.RLock()
+    lcr._settings = None
+    return lcr
+
+
+def test_get_by_compound_query():
+    lcr = _lcr_meter()
+    assert lcr.get() == 1.0e-12
+    assert lcr.get() == 1.0e-12
+    assert lcr._inst.commands == [':function:impedance:type?;:fetch?'] * 2
+
+
+def test_get_with_settings_cache():
+    lcr = _lcr_meter()
+    lcr.enable_settings_cache()
+    assert lcr.get() == 1.0e-12
+    assert lcr.get() == 1.0e-12
+    assert lcr._inst.commands == [':function:impedance:type?;:fetch?',
+                                  ':fetch?']
+
+    # Written mode is used without a query
+    lcr.set_mode(lcr.Mode.INDUCTANCE)
+    assert lcr.get() == 1.0e-12
+    assert lcr._inst.commands[-2:] == [':function:impedance:type LSD',
+                                       ':fetch?']
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import matplotlib
+matplotlib.use('Agg')
+
+import numpy as np  # noqa: E402
+
+from common import RecordBatch  # noqa: E402
+from gui import MeasureMonitor, MonitorProcess  # noqa: E402
+
+
+def _monitor(**kwargs):
+    view = MeasureMonitor.MonitorParameter('time / s', 'T / K')
+    view.add_plot(key='T', value_fmt='%.3f')
+    return MeasureMonitor(view, **kwargs)
+
+
+def _count_draws(monitor):
+    draws = list()
+    monitor.fig.canvas.mpl_connect('draw_event', draws.append)
+    return draws
+
+
+def test_constant_data_is_blitted():
+    monitor = _monitor(max_fps=None)
+    for i in range(10):
+        monitor.update((float(i), 4.2))
+
+    # No full redraw once the data is inside the limits
+    draws = _count_draws(monitor)
+    for i in range(100):
+        monitor.update((float(i % 10), 4.2))
+    assert len(draws) == 0
+    lo, hi = monitor.axes[0].get_ylim()
+    assert lo < 4.2 < hi
+
+
+def test_throttled_data_is_drawn():
+    monitor = _monitor(max_fps=2.0)
+    frames = list()
+    draw_artists = monitor._draw_artists
+
+    def count_frames():
+        frames.append(None)
+        draw_artists()
+    monitor._draw_artists = count_frames
+
+    monitor.update((0.0, 1.0))
+    monitor.update((1.0, 1.0))
+    assert monitor._dirty
+    n_frames = len(frames)
+
+    # Skipped until the interval has passed
+    monitor.refresh()
+    assert len(frames) == n_frames
+    monitor._last_render -= 1.0
+    monitor.refresh()
+    assert len(frames) > n_frames
+    assert not monitor._dirty
+
+
+def test_update_batch_mapping():
+    view = MeasureMonitor.MonitorParameter('time / s', 'V')
+    view.add_plot(key='ch1')
+    view.add_plot(key='ch2')
+    batch = RecordBatch(dict(time=np.arange(3.0), ch1=np.ones(3)))
+
+    # In-process and out-of-process monitors pass the same update
+    updates = list()
+    monitor = MeasureMonitor(view)
+    monitor.update = lambda *args: updates.append(args)
+    monitor.update_batch(batch)
+    process = MonitorProcess.__new__(MonitorProcess)
+    process._params = [view]
+    process.update = lambda *args: updates.append(args)
+    process.update_batch(batch)
+
+    assert len(updates) == 2
+    for update in updates:
+        (ch1, ch2), = update
+        assert ch2 is None
+        assert np.array_equal(ch1[0], batch['time'])
+        assert np.array_equal(ch1[1], batch['ch1'])
+
+
+def test_decimated_only_when_drawn(monkeypatch):
+    from gui import monitor as monitor_module
+    calls = list()
+    minmax_indices = monitor_module._minmax_indices
+
+    def count_calls(ys, n_points):
+        calls.append(ys.shape[0])
+        return minmax_indices(ys, n_points)
+    monkeypatch.setattr(monitor_module, '_minmax_indices', count_calls)
+
+    view = MeasureMonitor.MonitorParameter('time / s', 'V')
+    view.add_plot(key='ch1', value_fmt='%.3f', display_points=100)
+    monitor = MeasureMonitor(view, max_fps=1.0)
+    xs = np.arange(1000.0)
+    for i in range(10):
+        monitor.update([(xs + i * 1000, np.sin(xs))])
+    # Throttled updates are not decimated
+    assert len(calls) == 1
+    plotter, = monitor._plotters[0]
+    assert len(plotter) == 10000
+    assert plotter.text.get_text() == 'ch1: %.3f' % np.sin(xs[-1])
+
+    monitor._last_render -= 1.0
+    monitor.refresh()
+    assert calls == [1000, 10000]
+    assert len(plotter.plot.get_offsets()) <= 102
+
+    # Cached while the buffer does not change
+    monitor._last_render -= 1.0
+    monitor._render()
+    assert len(calls) == 2
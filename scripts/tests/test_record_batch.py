@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from common import RecordBatch
+
+
+def test_columns():
+    batch = RecordBatch(dict(time=[0.0, 1.0], T=[4.2, 4.3]),
+                        units=dict(time='s'), meta=dict(run=1))
+    assert len(batch) == 2
+    assert batch.labels == ['time', 'T']
+    assert 'T' in batch and 'X' not in batch
+    assert isinstance(batch['T'], np.ndarray)
+    assert list(batch.rows()) == [dict(time=0.0, T=4.2),
+                                  dict(time=1.0, T=4.3)]
+
+    with pytest.raises(ValueError):
+        RecordBatch(dict(time=[0.0, 1.0], T=[4.2]))
+
+
+def test_from_rows():
+    rows = [dict(time=0.0, T=4.2, f=10), dict(time=1.0, T=4.3, f=11)]
+    batch = RecordBatch.from_rows(rows)
+    assert batch.labels == ['time', 'T', 'f']
+    assert np.array_equal(batch['f'], [10, 11])
+
+    # Selected labels in the given order
+    batch = RecordBatch.from_rows(rows, labels=['T', 'time'])
+    assert batch.labels == ['T', 'time']
+    assert list(batch.rows()) == [dict(T=4.2, time=0.0),
+                                  dict(T=4.3, time=1.0)]
+
+    batch = RecordBatch.from_rows([])
+    assert len(batch) == 0 and batch.labels == []
+
+
+def test_concatenate():
+    first = RecordBatch(dict(time=[0.0, 1.0], T=[4.2, 4.3]),
+                        units=dict(T='K'), meta=dict(run=1))
+    second = RecordBatch(dict(time=[2.0], T=[4.4]))
+    batch = RecordBatch.concatenate([first, second])
+    assert len(batch) == 3
+    assert np.array_equal(batch['time'], [0.0, 1.0, 2.0])
+    assert np.array_equal(batch['T'], [4.2, 4.3, 4.4])
+    # Units and meta of the first batch are kept
+    assert batch.units == dict(T='K') and batch.meta == dict(run=1)
+
+    batch = RecordBatch.concatenate([])
+    assert len(batch) == 0
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from device.registry import DriverRegistry, load_driver
+from device.oscilloscope.yokogawa_dl9140l import Yokogawa_DL9140L
+
+YOKOGAWA = 'device.oscilloscope.yokogawa_dl9140l:Yokogawa_DL9140L'
+
+
+class _Generic():
+    pass
+
+
+class _Specific():
+    pass
+
+
+def test_longest_prefix():
+    registry = DriverRegistry()
+    registry.register('MAKER,', _Generic)
+    registry.register(('MAKER,MODEL1', 'MAKER,MODEL2'), _Specific)
+    assert registry.find('MAKER,MODEL1,123,1.0') is _Specific
+    assert registry.find('MAKER,MODEL2') is _Specific
+    assert registry.find('MAKER,MODEL3') is _Generic
+    assert registry.find('OTHER,MODEL1') is None
+    assert registry.find('') is None
+
+
+def test_lazy_driver():
+    registry = DriverRegistry()
+    registry.register('YOKOGAWA,701311', YOKOGAWA)
+    assert registry.find('YOKOGAWA,701311,0,1.0') is Yokogawa_DL9140L
+    # Resolved driver replaces the name
+    assert registry._index[len('YOKOGAWA,701311')]['YOKOGAWA,701311'] \
+        is Yokogawa_DL9140L
+    assert load_driver(YOKOGAWA) is Yokogawa_DL9140L
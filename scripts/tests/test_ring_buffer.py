@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from gui.monitor import _RingBuffer
+
+
+def _extend(buf, points):
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    buf.extend(points[:, 0], points[:, 1])
+
+
+@pytest.mark.parametrize('chunk', [1, 2, 3, 5])
+def test_bounded_compaction(chunk):
+    buf = _RingBuffer(maxlen=5)
+    capacity = buf._data.shape[0]
+    points = np.arange(200.0).reshape(-1, 2)
+    for i in range(0, points.shape[0], chunk):
+        end = min(i + chunk, points.shape[0])
+        _extend(buf, points[i:end])
+        # The last points are moved to the head instead of reallocating
+        assert buf._data.shape[0] == capacity
+        assert np.array_equal(buf.points, points[max(0, end - 5):end])
+
+
+def test_extend_over_maxlen():
+    buf = _RingBuffer(maxlen=4)
+    _extend(buf, [(0, 0), (1, 1)])
+    points = np.arange(20.0).reshape(-1, 2)
+    _extend(buf, points)
+    assert np.array_equal(buf.points, points[-4:])
+    assert np.array_equal(buf.xs, points[-4:, 0])
+    assert np.array_equal(buf.ys, points[-4:, 1])
+
+
+def test_unbounded_growth():
+    buf = _RingBuffer(capacity=4)
+    points = np.random.RandomState(0).randn(1000, 2)
+    for i in range(0, 1000, 7):
+        _extend(buf, points[i:i + 7])
+    assert np.array_equal(buf.points, points)
+    assert buf._data.shape[0] >= 1000
+
+    buf.clear()
+    assert len(buf) == 0
+    _extend(buf, points[:3])
+    assert np.array_equal(buf.points, points[:3])
+
+
+def test_random_against_reference():
+    rng = np.random.RandomState(1)
+    for _ in range(50):
+        maxlen = rng.randint(1, 20)
+        buf = _RingBuffer(maxlen=maxlen)
+        ref = np.zeros((0, 2))
+        for _ in range(30):
+            points = rng.randn(rng.randint(0, 2 * maxlen + 2), 2)
+            _extend(buf, points)
+            ref = np.concatenate([ref, points])[-maxlen:]
+            assert np.array_equal(buf.points, ref)
+
+
+def _assert_limits(buf):
+    assert np.array_equal(buf.lower, np.nanmin(buf.points, axis=0))
+    assert np.array_equal(buf.upper, np.nanmax(buf.points, axis=0))
+
+
+def test_evicted_extrema():
+    buf = _RingBuffer(maxlen=3)
+    # y: the minimum and then the maximum are evicted
+    _extend(buf, [(0, -5), (1, 9), (2, 1)])
+    assert tuple(buf.lower) == (0, -5) and tuple(buf.upper) == (2, 9)
+    _extend(buf, [(3, 2)])
+    assert tuple(buf.lower) == (1, 1) and tuple(buf.upper) == (3, 9)
+    _extend(buf, [(4, 0)])
+    assert tuple(buf.lower) == (2, 0) and tuple(buf.upper) == (4, 2)
+    assert not buf._sorted[1]
+
+
+def test_sorted_to_unsorted():
+    buf = _RingBuffer(maxlen=4)
+    _extend(buf, [(0, 0), (1, 1), (2, 2), (3, 3)])
+    assert buf._sorted.all()
+    # Extrema of sorted columns are the end points
+    _extend(buf, [(4, 4)])
+    assert tuple(buf.lower) == (1, 1) and tuple(buf.upper) == (4, 4)
+
+    # x goes back after the former minimum was evicted
+    _extend(buf, [(0.5, 3.5)])
+    assert list(buf._sorted) == [False, False]
+    _assert_limits(buf)
+    for point in [(6, 10), (7, -1), (8, 2), (9, 3), (10, 4)]:
+        _extend(buf, [point])
+        _assert_limits(buf)
+
+
+def test_nan():
+    buf = _RingBuffer(maxlen=3)
+    _extend(buf, [(0, np.nan)])
+    _extend(buf, [(1, 2.0), (2, np.nan)])
+    assert not buf._sorted[1]
+    assert tuple(buf.lower) == (0, 2.0) and tuple(buf.upper) == (2, 2.0)
+    _extend(buf, [(3, 5.0)])
+    _assert_limits(buf)
+    _extend(buf, [(4, -1.0), (5, np.nan)])
+    _assert_limits(buf)
+
+
+def test_random_limits():
+    rng = np.random.RandomState(2)
+    for _ in range(50):
+        maxlen = rng.randint(1, 20)
+        buf = _RingBuffer(maxlen=maxlen)
+        t = 0.0
+        for _ in range(30):
+            n = rng.randint(1, 2 * maxlen + 2)
+            # Mostly increasing x with occasional steps back
+            xs = t + np.cumsum(rng.rand(n)) - (rng.rand() < 0.1) * maxlen
+            t = xs[-1]
+            ys = rng.randn(n)
+            ys[rng.rand(n) < 0.05] = np.nan
+            buf.extend(xs, ys)
+            if not np.isnan(buf.ys).all():
+                _assert_limits(buf)
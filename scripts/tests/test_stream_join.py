@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from stream_join import StreamBuffer
+
+
+def _buffer(times, **kwargs):
+    buf = StreamBuffer(['T'], **kwargs)
+    buf.extend(times, dict(T=np.asarray(times) * 10))
+    return buf
+
+
+def test_out_of_order():
+    buf = _buffer([1.0, 2.0, 4.0])
+    buf.extend([3.0, 0.5], dict(T=[30.0, 5.0]))
+    buf.append(5.0, dict(T=50.0))
+    buf.extend([2.5], [dict(T=25.0)])
+    assert list(buf.times) == [0.5, 1.0, 2.0, 2.5, 3.0, 4.0, 5.0]
+    # Values are moved with their times
+    assert np.array_equal(buf.column('T'), buf.times * 10)
+
+
+def test_growth_and_compaction():
+    buf = StreamBuffer(['T'], capacity=4)
+    times = np.arange(100.0)
+    for t in times:
+        buf.append(t, dict(T=t * 10))
+        if t % 3 == 0:
+            buf.discard(1)
+    assert np.array_equal(buf.times, times[34:])
+    assert np.array_equal(buf.column('T'), times[34:] * 10)
+
+
+def test_asof():
+    buf = _buffer([1.0, 2.0, 3.0])
+    # Before the first sample and after the last
+    assert buf.asof(0.5) == -1
+    assert buf.asof(1.0) == 0
+    assert buf.asof(2.5) == 1
+    assert buf.asof(10.0) == 2
+    assert list(buf.asof(np.array([0.0, 2.0, 3.5]))) == [-1, 1, 2]
+    assert StreamBuffer(['T']).asof(1.0) == -1
+
+
+def test_nearest():
+    buf = _buffer([1.0, 2.0, 3.0])
+    assert buf.nearest(0.0) == 0
+    assert buf.nearest(10.0) == 2
+    assert buf.nearest(2.2) == 1
+    # Ties go to the earlier sample
+    assert buf.nearest(1.5) == 0
+    assert buf.nearest(2.5) == 1
+    assert list(buf.nearest(np.array([0.0, 2.6, 10.0]), tolerance=0.5)) \
+        == [-1, 2, -1]
+    assert list(StreamBuffer(['T']).nearest(np.array([1.0, 2.0]))) == \
+        [-1, -1]
+
+
+def test_window():
+    buf = _buffer([1.0, 2.0, 3.0, 4.0])
+    # (start, end]
+    assert buf.window(1.0, 3.0) == (1, 3)
+    assert buf.window(0.0, 0.5) == (0, 0)
+    assert buf.window(4.0, 5.0) == (4, 4)
+
+
+def test_max_age():
+    buf = _buffer([1.0, 2.0, 3.0], max_age=1.5)
+    assert list(buf.times) == [2.0, 3.0]
+    buf.append(5.0, dict(T=50.0))
+    # Samples exactly max_age old are kept
+    buf.append(6.5, dict(T=65.0))
+    assert list(buf.times) == [5.0, 6.5]
+
+
+def test_maxlen():
+    buf = _buffer(np.arange(10.0), maxlen=4, capacity=4)
+    assert list(buf.times) == [6.0, 7.0, 8.0, 9.0]
+    for t in np.arange(10.0, 20.0):
+        buf.append(t, dict(T=t * 10))
+    assert list(buf.times) == [16.0, 17.0, 18.0, 19.0]
+    assert np.array_equal(buf.column('T'), buf.times * 10)
+
+
+def test_pop_until():
+    buf = _buffer([1.0, 2.0, 3.0])
+    # Samples at exactly t are included
+    batch = buf.pop_until(2.0)
+    assert list(batch['time']) == [1.0, 2.0]
+    assert list(batch['T']) == [10.0, 20.0]
+    assert list(buf.times) == [3.0]
+
+    assert len(buf.pop_until(2.5)) == 0
+    assert list(buf.pop_until(3.0, time_label='t')['t']) == [3.0]
+    assert len(buf) == 0
+    assert len(buf.pop_until(10.0)) == 0
+
+
+def test_batch():
+    buf = _buffer([1.0, 2.0, 3.0])
+    batch = buf.batch(1)
+    assert batch.labels == ['time', 'T']
+    assert list(batch['time']) == [2.0, 3.0]
+    buf.discard_before(2.5)
+    assert list(buf.times) == [3.0]
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import time
+import threading
+
+from timer import Scheduler, Timer
+
+
+def test_restart_while_running():
+    scheduler = Scheduler()
+    running = threading.Event()
+    release = threading.Event()
+    calls = list()
+
+    def action():
+        calls.append(time.time())
+        running.set()
+        release.wait()
+
+    timer = Timer(action, 0.2, scheduler=scheduler)
+    timer.start()
+    assert running.wait(2.0)
+
+    # Interval setter stops the timer while its action is running
+    timer.interval = 0.2
+    timer.start()
+    release.set()
+    time.sleep(0.1)
+    with scheduler._cond:
+        assert len(scheduler._heap) == 1
+
+    time.sleep(1.0)
+    timer.stop()
+    # One run per interval
+    assert all(t1 - t0 > 0.1 for t0, t1 in zip(calls, calls[1:]))
+
+
+def test_stop_while_running():
+    scheduler = Scheduler()
+    running = threading.Event()
+    release = threading.Event()
+    calls = list()
+
+    def action():
+        calls.append(time.time())
+        running.set()
+        release.wait()
+
+    timer = Timer(action, 0.1, scheduler=scheduler)
+    timer.start()
+    assert running.wait(2.0)
+    timer.stop()
+    release.set()
+    time.sleep(0.3)
+    assert len(calls) == 1
+    with scheduler._cond:
+        assert len(scheduler._heap) == 0
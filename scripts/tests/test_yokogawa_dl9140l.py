@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from device.oscilloscope.yokogawa_dl9140l import Yokogawa_DL9140L
+
+
+class _Resource():
+    def __init__(self, response):
+        self.response = response
+        self.commands = list()
+
+    def query(self, cmd):
+        self.commands.append(cmd)
+        return self.response + '\n'
+
+
+def _yokogawa(response):
+    # Handler without opening a visa resource
+    osc = Yokogawa_DL9140L.__new__(Yokogawa_DL9140L)
+    osc._inst = _Resource(response)
+    osc._bus_lock = threading.RLock()
+    osc._lock = threading.RLock()
+    osc._settings = None
+    return osc
+
+
+def test_query_many_verbose():
+    osc = _yokogawa(':WAVEFORM:BITS 16;:WAVEFORM:OFFSET 0.0E+00')
+    values = osc.query_many(('waveform:bits?', 'waveform:offset?'),
+                            (int, float))
+    assert values == (16, 0.0)
+    assert osc._inst.commands == [':waveform:bits?;:waveform:offset?']
+
+
+def test_query_many_duplicated_headers():
+    osc = _yokogawa(':CHANNEL:DISPLAY 1;:CHANNEL:DISPLAY 0;'
+                    ':CHANNEL:DISPLAY 1')
+    values = osc.query_many([':channel%d:display?' % i for i in (1, 2, 3)],
+                            [int] * 3)
+    assert values == (1, 0, 1)
+
+
+def test_query_many_without_headers():
+    osc = _yokogawa('16;0.0E+00;2.0E+00')
+    values = osc.query_many((':waveform:bits?', ':waveform:offset?',
+                             ':waveform:range?'), (int, float, float))
+    assert values == (16, 0.0, 2.0)
@@ -1,9 +1,15 @@
 # -*- co ding: utf-8 -*-
 import math
 import time
-from multiprocessing import Process, Queue
+import heapq
+import itertools
+import threading
+from enum import Enum
+from collections import deque
 
-from device import DeviceHandler, DeviceProvider
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
 
 
 class TimeKeeper():
@@ -19,30 +25,94 @@ class TimeKeeper():
         return max(self._interval - err, self._mintime)
 
 
-def _loop(action, interval, queue, *args, **kwargs):
-    provider = DeviceProvider()
-    args = [provider(v) if is_device else v for (v, is_device) in args]
-    kwargs = {k:provider(v) if is_device else v
-              for k, (v, is_device) in kwargs.items()}
-    timer = TimeKeeper(interval)
-
-    while True:
-        time.sleep(timer())
-        result = action(*args, **kwargs)
-        queue.put((result, time.time()))
+class Scheduler():
+    def __init__(self):
+        # Heap of (due time, sequence number, timer, generation)
+        self._heap = list()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def _push(self, timer, generation):
+        due = time.time() + timer._keeper()
+        heapq.heappush(self._heap,
+                       (due, next(self._seq), timer, generation))
+        self._cond.notify()
+
+    def add(self, timer):
+        with self._cond:
+            self._push(timer, timer._generation)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop,
+                                                daemon=True)
+                self._thread.start()
+
+    def remove(self, timer):
+        with self._cond:
+            self._heap = [item for item in self._heap if item[2] is not timer]
+            heapq.heapify(self._heap)
+            self._cond.notify()
+
+    def _next(self):
+        with self._cond:
+            while True:
+                if len(self._heap) == 0:
+                    self._cond.wait()
+                    continue
+
+                wait = self._heap[0][0] - time.time()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+
+                _, _, timer, generation = heapq.heappop(self._heap)
+                # Entries of a stopped or restarted timer are stale
+                if timer.is_alive() and generation == timer._generation:
+                    return timer, generation
+
+    def _loop(self):
+        while True:
+            timer, generation = self._next()
+            timer._run()
+
+            with self._cond:
+                # Timer may be stopped or restarted while its action is
+                # running; a restarted timer is already queued by start()
+                if timer.is_alive() and generation == timer._generation:
+                    self._push(timer, generation)
+
+
+# All timers share one scheduler thread and the opened devices
+default_scheduler = Scheduler()
+
+
+class Overflow(Enum):
+    # Discard the oldest unfetched result
+    DROP_OLDEST = 'drop_oldest'
+    # Do not run the action until results are fetched
+    SKIP = 'skip'
 
 
 class Timer():
-    def __init__(self, action, interval, args=list(), kwargs=dict()):
+    def __init__(self, action, interval, args=list(), kwargs=dict(),
+                 scheduler=None, maxlen=None, overflow=Overflow.DROP_OLDEST):
         self._action = action
         self._interval = interval
-        self._process = None
-        self._queue = Queue()
-
-        self._args = [(v.address, True) if isinstance(v, DeviceHandler)
-                      else (v, False) for v in args]
-        self._kwargs = {k:(v.address, True) if isinstance(v, DeviceHandler)
-                        else (v, False) for k, v in kwargs.items()}
+        self._args = args
+        self._kwargs = kwargs
+        self._scheduler = default_scheduler if scheduler is None \
+                          else scheduler
+        # Results are passed by reference, without serialization
+        self._results = deque()
+        self._maxlen = maxlen
+        self._overflow = Overflow(overflow)
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self._keeper = None
+        # Incremented by start() to invalidate the scheduled runs
+        self._generation = 0
+        self._stopped = threading.Event()
+        self._stopped.set()
 
     @property
     def interval(self):
@@ -53,29 +123,56 @@ class Timer():
         self.stop()
         self._interval = interval
 
+    def is_alive(self):
+        return not self._stopped.is_set()
+
+    def _is_full(self):
+        return self._maxlen is not None and \
+               len(self._results) >= self._maxlen
+
+    def _run(self):
+        name = getattr(self._action, '__name__', self._action)
+        if self._overflow == Overflow.SKIP and self._is_full():
+            logger.warning('Timer action "%s" is skipped. '
+                           '(%d results are not fetched)',
+                           name, len(self._results))
+            with self._lock:
+                self.dropped += 1
+            return
+
+        try:
+            result = self._action(*self._args, **self._kwargs)
+        except Exception:
+            logger.exception('Timer action "%s" failed.', name)
+            return
+
+        with self._lock:
+            if self._is_full():
+                logger.warning('Oldest result of "%s" is dropped.', name)
+                self._results.popleft()
+                self.dropped += 1
+            self._results.append((result, time.time()))
+
     def stop(self):
-        if self._process is not None:
-            self._process.terminate()
-            self._process.join()
-            self._process.close()
-            self._process = None
+        if self.is_alive():
+            self._stopped.set()
+            self._scheduler.remove(self)
 
     def start(self):
-        if self._process is None or not self._process.is_alive():
-            self._process = Process(target=_loop, daemon=True,
-                                    args=(self._action, self._interval,
-                                          self._queue, *self._args),
-                                    kwargs=self._kwargs)
-            self._process.start()
-
+        if not self.is_alive():
+            self._keeper = TimeKeeper(self._interval)
+            self._generation += 1
+            self._stopped.clear()
+            self._scheduler.add(self)
 
     def join(self):
-        if self._process is not None:
-            self._process.join()
-            self._process = None
+        self._stopped.wait()
 
     def fetch(self):
-        return [self._queue.get() for _ in range(self._queue.qsize())]
+        with self._lock:
+            results = list(self._results)
+            self._results.clear()
+        return results
 
     def __del__(self):
         self.stop()